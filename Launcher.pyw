@@ -3,7 +3,8 @@
 DefectDojo Engagement Manager Launcher (full)
 - Silent server start (no console) and robust stop/kill
 - Minimize to system tray (pystray + Pillow required for tray)
-- Check for new version from API, download .zip, extract and replace files
+- Check for new version from API and install only the files that changed
+  (HTTP Range reads of the release zip, resumable full download as fallback)
 - Save/update token.json from GUI (token displayed masked: first 4 + last 4 visible)
 - Optional psutil for more reliable process cleanup
 - All long-running/network tasks run in background threads
@@ -11,7 +12,7 @@ DefectDojo Engagement Manager Launcher (full)
 
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-import subprocess, sys, threading, requests, json, time, os, signal, tempfile, shutil, zipfile, traceback
+import subprocess, sys, threading, requests, json, time, os, signal, tempfile, shutil, zipfile, zlib, traceback
 
 # Optional libraries
 try:
@@ -40,6 +41,19 @@ DOWNLOAD_ENDPOINT = "/api/v2/engagements/14/files/download/1/"
 
 # Files/folders to remove before replacing with update
 REMOVE_LIST = ["static", "templates", "app.py", "version.json"]
+# Local files an update never overwrites once they exist
+PRESERVE_LIST = ["token.json"]
+# Partial downloads are kept here so an interrupted update can resume
+UPDATE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "dd_update")
+RANGE_READ_AHEAD = 256 * 1024
+
+# Local server endpoints
+SERVER_URL = "http://127.0.0.1:5000"
+HEALTH_ENDPOINT = "/healthz"
+SHUTDOWN_ENDPOINT = "/shutdown"
+PROFILING_ENDPOINT = "/api/profiling"
+PROFILE_REPORT_ENDPOINT = "/api/profiling/latest"
+GRACEFUL_STOP_TIMEOUT = 10
 
 # ---------- Utility functions ----------
 
@@ -61,6 +75,231 @@ def mask_token_display(token: str) -> str:
         return s[0] + "•" * (len(s)-2) + s[-1]
     return s[:4] + "•" * (len(s)-8) + s[-4:]
 
+# ---------- Delta update helpers ----------
+# The release zip's central directory is the manifest: every member carries a
+# CRC-32 and size, so it can be compared with the installed files and only the
+# members that differ are fetched (with HTTP Range when the server allows it).
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class HttpRangeFile:
+    """
+    Read-only, seekable file object over a remote file, backed by HTTP Range
+    requests. zipfile only touches the central directory and the members that
+    are actually opened, so this downloads a few KB plus the changed files.
+    """
+
+    def __init__(self, url, headers=None, read_ahead=RANGE_READ_AHEAD, session=None):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.read_ahead = read_ahead
+        self.session = session or requests.Session()
+        self.pos = 0
+        self.bytes_fetched = 0
+        self._buf_start = 0
+        self._buf = b""
+        with self.session.get(url, headers=dict(self.headers, Range="bytes=0-0"), stream=True, timeout=30) as r:
+            content_range = r.headers.get("Content-Range", "")
+            if r.status_code != 206 or "/" not in content_range:
+                raise RangeNotSupported(f"status {r.status_code}")
+            self.size = int(content_range.rsplit("/", 1)[1])
+            # pin every later read to this exact file
+            self.validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        else:
+            self.pos = self.size + offset
+        self.pos = max(0, self.pos)
+        return self.pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.pos
+        end = min(self.pos + n, self.size)
+        if end <= self.pos:
+            return b""
+        if not (self._buf_start <= self.pos and end <= self._buf_start + len(self._buf)):
+            self._fetch(self.pos, max(end, self.pos + self.read_ahead))
+        data = self._buf[self.pos - self._buf_start:end - self._buf_start]
+        self.pos += len(data)
+        return data
+
+    def _fetch(self, start, end):
+        end = min(end, self.size)
+        if start >= self.size - self.read_ahead:
+            # zipfile starts at the end record and walks back into the central
+            # directory; one request for the whole tail covers both
+            start, end = max(0, self.size - self.read_ahead), self.size
+        headers = dict(self.headers, Range=f"bytes={start}-{end - 1}")
+        if self.validator:
+            headers["If-Range"] = self.validator
+        r = self.session.get(self.url, headers=headers, timeout=60)
+        if r.status_code != 206:
+            raise Exception(f"Remote update file changed or range request failed (status {r.status_code})")
+        self._buf_start = start
+        self._buf = r.content
+        self.bytes_fetched += len(r.content)
+
+    def close(self):
+        pass
+
+
+def download_resumable(url, headers, dest, progress=None):
+    """
+    Download url to dest. Bytes already in dest + '.part' are kept and the
+    transfer continues with a Range request (If-Range guards against the
+    remote file having changed in between).
+    """
+    part = dest + ".part"
+    meta_path = part + ".json"
+    have = os.path.getsize(part) if os.path.exists(part) else 0
+    validator = None
+    if have:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                validator = json.load(f).get("validator")
+        except Exception:
+            validator = None
+    req_headers = dict(headers)
+    if have and validator:
+        req_headers["Range"] = f"bytes={have}-"
+        req_headers["If-Range"] = validator
+    with requests.get(url, headers=req_headers, stream=True, timeout=60) as r:
+        if r.status_code == 416:
+            # already complete
+            pass
+        elif r.status_code not in (200, 201, 202, 206):
+            raise Exception(f"Download failed with status {r.status_code}")
+        else:
+            mode = "ab" if r.status_code == 206 else "wb"
+            if mode == "wb":
+                have = 0
+            total = None
+            if r.status_code == 206 and "/" in r.headers.get("Content-Range", ""):
+                total = r.headers["Content-Range"].rsplit("/", 1)[1]
+            elif r.headers.get("Content-Length"):
+                total = r.headers["Content-Length"]
+            total = int(total) if total and total.isdigit() else None
+            validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "validator": validator}, f)
+            with open(part, mode) as fd:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    if chunk:
+                        fd.write(chunk)
+                        have += len(chunk)
+                        if progress:
+                            progress(have, total)
+            if total is not None and have < total:
+                raise Exception(f"Download interrupted at {have} of {total} bytes; retry to resume.")
+    os.replace(part, dest)
+    try:
+        os.remove(meta_path)
+    except Exception:
+        pass
+    return dest
+
+
+def file_crc32(path, chunk_size=1024 * 1024):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+    return crc & 0xFFFFFFFF
+
+
+def zip_install_map(zf):
+    """
+    Map install-relative paths to zip members. A single top-level folder
+    shared by every member (e.g. 'Project/') is stripped; unsafe paths are
+    skipped.
+    """
+    members = [i for i in zf.infolist() if not i.is_dir()]
+    names = [i.filename for i in members]
+    prefix = ""
+    tops = {n.split("/", 1)[0] for n in names}
+    if len(tops) == 1 and all("/" in n for n in names):
+        prefix = tops.pop() + "/"
+    mapping = {}
+    for info in members:
+        rel = info.filename[len(prefix):]
+        parts = rel.split("/")
+        if not rel or rel.startswith("/") or ".." in parts or ":" in parts[0]:
+            continue
+        mapping[os.path.normpath(rel)] = info
+    return mapping
+
+
+def changed_members(mapping, install_dir):
+    changed = []
+    for rel, info in mapping.items():
+        if rel in PRESERVE_LIST and os.path.exists(os.path.join(install_dir, rel)):
+            continue
+        dst = os.path.join(install_dir, rel)
+        try:
+            if os.path.getsize(dst) == info.file_size and file_crc32(dst) == info.CRC:
+                continue
+        except OSError:
+            pass
+        changed.append(rel)
+    return changed
+
+
+def install_members(zf, mapping, rels, install_dir):
+    """Stream each member to a temp file next to its target, then os.replace it in."""
+    for rel in rels:
+        dst = os.path.join(install_dir, rel)
+        target_dir = os.path.dirname(dst) or install_dir
+        os.makedirs(target_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target_dir, prefix=".update-", suffix=".tmp")
+        try:
+            # ZipExtFile checks the CRC when the member has been fully read
+            with os.fdopen(fd, "wb") as out, zf.open(mapping[rel]) as src:
+                shutil.copyfileobj(src, out, 256 * 1024)
+            os.replace(tmp, dst)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def stale_files(mapping, install_dir):
+    """Files under REMOVE_LIST entries that the new release no longer ships."""
+    stale = []
+    for rel in REMOVE_LIST:
+        path = os.path.join(install_dir, rel)
+        if os.path.isfile(path):
+            if os.path.normpath(rel) not in mapping:
+                stale.append(path)
+        elif os.path.isdir(path):
+            for rootdir, dirs, files in os.walk(path):
+                for fname in files:
+                    full = os.path.join(rootdir, fname)
+                    if os.path.relpath(full, install_dir) not in mapping:
+                        stale.append(full)
+    return stale
+
+
 # ---------- Main Launcher class ----------
 
 class DefectDojoLauncher:
@@ -79,6 +318,10 @@ class DefectDojoLauncher:
         self.tray_icon = None
         self._tray_visible = False
 
+        # set while a stop runs in the background; callbacks to run once it is done
+        self._stopping = False
+        self._after_stop = []
+
         # token handling
         self._full_token = None  # store the real token in memory (not masked)
         self.token_mask_var = tk.StringVar(value="")  # shown in the disabled entry
@@ -155,6 +398,14 @@ class DefectDojoLauncher:
         self.open_btn = ttk.Button(btns, text="Open Browser", width=16, command=self.open_browser, state=tk.DISABLED)
         self.open_btn.pack(side=tk.LEFT, padx=6)
 
+        # Profiling controls (server must be running)
+        prof = ttk.Frame(main)
+        prof.pack(pady=(0,6))
+        self.profile_btn = ttk.Button(prof, text="Enable Profiling", width=20, command=self.toggle_profiling, state=tk.DISABLED)
+        self.profile_btn.pack(side=tk.LEFT, padx=6)
+        self.report_btn = ttk.Button(prof, text="Open Latest Profile", width=20, command=self.open_latest_profile, state=tk.DISABLED)
+        self.report_btn.pack(side=tk.LEFT, padx=6)
+
         # Tray controls
         tray_frame = ttk.Frame(main)
         tray_frame.pack(fill=tk.X, pady=(6,0))
@@ -328,83 +579,86 @@ class DefectDojoLauncher:
                 self._set_status_text("Update cancelled by user.", "blue")
                 return
             # proceed download
-            self._set_status_text("Downloading update...", "orange")
+            self._set_status_text("Comparing files with the release...", "orange")
             download_url = API_BASE.rstrip("/") + DOWNLOAD_ENDPOINT
-            tmpdir = tempfile.mkdtemp(prefix="dd_update_")
-            zip_path = os.path.join(tmpdir, "update.zip")
-            # stream download
-            with requests.get(download_url, headers=self._get_headers(), stream=True, timeout=60) as r:
-                if r.status_code not in (200, 201, 202):
-                    raise Exception(f"Download failed with status {r.status_code}")
-                with open(zip_path, "wb") as fd:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            fd.write(chunk)
-            # validate zip
-            if not zipfile.is_zipfile(zip_path):
-                raise Exception("Downloaded file is not a valid zip archive.")
-            self._set_status_text("Applying update...", "orange")
-            extract_dir = os.path.join(tmpdir, "extracted")
-            os.makedirs(extract_dir, exist_ok=True)
-            with zipfile.ZipFile(zip_path, "r") as zf:
-                zf.extractall(extract_dir)
-            # remove old targets
-            for rel in REMOVE_LIST:
-                path = safe_join_cwd(rel)
-                try:
-                    if os.path.isdir(path):
-                        shutil.rmtree(path)
-                    elif os.path.isfile(path):
-                        os.remove(path)
-                except Exception:
-                    # ignore but continue
-                    pass
-            # copy extracted files into cwd
-            copied_any = False
-            for rootdir, dirs, files in os.walk(extract_dir):
-                rel_root = os.path.relpath(rootdir, extract_dir)
-                target_root = safe_join_cwd(rel_root) if rel_root != "." else os.getcwd()
-                os.makedirs(target_root, exist_ok=True)
-                for fname in files:
-                    src = os.path.join(rootdir, fname)
-                    dst = os.path.join(target_root, fname)
-                    try:
-                        shutil.copy2(src, dst)
-                        copied_any = True
-                    except Exception:
-                        try:
-                            if os.path.exists(dst):
-                                os.remove(dst)
-                            shutil.copy2(src, dst)
-                            copied_any = True
-                        except Exception:
-                            pass
-            # cleanup zip and temp dir
+            changed, removed = self._apply_update(download_url, remote_version)
+            # write new version.json last, so an interrupted update is retried
             try:
-                os.remove(zip_path)
-            except Exception:
-                pass
-            try:
-                shutil.rmtree(tmpdir)
-            except Exception:
-                pass
-            if not copied_any:
-                raise Exception("Update applied but no files were copied. Check zip contents.")
-            # write new version.json
-            try:
-                with open(self._version_path(), "w", encoding="utf-8") as vf:
+                tmp_version = self._version_path() + ".tmp"
+                with open(tmp_version, "w", encoding="utf-8") as vf:
                     json.dump({"version": str(remote_version)}, vf, indent=2)
+                os.replace(tmp_version, self._version_path())
                 self.root.after(0, lambda: self.local_version_var.set(str(remote_version)))
             except Exception:
                 pass
             self._set_status_text(f"Update to {remote_version} applied successfully.", "green")
-            messagebox.showinfo("Update", f"Update to version {remote_version} applied successfully.")
+            messagebox.showinfo("Update", f"Update to version {remote_version} applied successfully.\n"
+                                          f"{len(changed)} file(s) updated, {len(removed)} removed.")
         except Exception as e:
             tb = traceback.format_exc()
             print("Update error:", tb)
             self._set_status_text("Update failed. See error dialog.", "red")
             messagebox.showerror("Update failed", f"{e}")
 
+    def _apply_update(self, download_url, remote_version):
+        """
+        Install only the members of the release zip whose CRC-32/size differ
+        from the local files. Reads the remote zip with HTTP Range requests;
+        if the server does not support ranges, the zip is downloaded in full
+        (resuming any earlier partial download) and applied the same way.
+        Returns (changed files, removed files).
+        """
+        install_dir = os.getcwd()
+        headers = self._get_headers()
+        try:
+            source = HttpRangeFile(download_url, headers=headers)
+            zip_path = None
+        except RangeNotSupported:
+            os.makedirs(UPDATE_CACHE_DIR, exist_ok=True)
+            safe_ver = "".join(c if c.isalnum() or c in "._-" else "_" for c in str(remote_version))
+            zip_path = os.path.join(UPDATE_CACHE_DIR, f"update-{safe_ver}.zip")
+
+            def progress(have, total):
+                if total:
+                    self._set_status_text(f"Downloading update... {have * 100 // total}%", "orange")
+
+            self._set_status_text("Downloading update...", "orange")
+            download_resumable(download_url, headers, zip_path, progress)
+            source = zip_path
+        try:
+            with zipfile.ZipFile(source, "r") as zf:
+                mapping = zip_install_map(zf)
+                if not mapping:
+                    raise Exception("Update zip contains no files. Check zip contents.")
+                # version.json is written by check_new_version once everything else is in,
+                # so an update interrupted here is still seen as pending next time
+                changed = [rel for rel in changed_members(mapping, install_dir) if rel != "version.json"]
+                self._set_status_text(f"Applying update ({len(changed)} changed file(s))...", "orange")
+                install_members(zf, mapping, changed, install_dir)
+        except zipfile.BadZipFile as e:
+            if zip_path:
+                try:
+                    os.remove(zip_path)
+                except Exception:
+                    pass
+            raise Exception(f"Downloaded file is not a valid zip archive ({e}).")
+        removed = stale_files(mapping, install_dir)
+        for path in removed:
+            try:
+                os.remove(path)
+            except Exception:
+                # ignore but continue
+                pass
+        if zip_path:
+            try:
+                os.remove(zip_path)
+            except Exception:
+                pass
+        if isinstance(source, HttpRangeFile):
+            print(f"Update: {len(changed)} changed, {len(removed)} removed, "
+                  f"{source.bytes_fetched} of {source.size} bytes fetched")
+        return changed, removed
+
     # ---------------- Server start / stop (silent) ----------------
     def _python_interpreter(self):
         exe = sys.executable
@@ -462,7 +716,7 @@ class DefectDojoLauncher:
         for _ in range(12):
             time.sleep(1)
             try:
-                r = requests.get("http://127.0.0.1:5000/", timeout=2)
+                r = requests.get(SERVER_URL + HEALTH_ENDPOINT, timeout=2)
                 if r.status_code == 200:
                     self.root.after(0, self._on_server_started)
                     return
@@ -472,9 +726,12 @@ class DefectDojoLauncher:
 
     def _on_server_started(self):
         self._set_status_text("Status: Running", "green")
-        self.url_label.config(text="http://127.0.0.1:5000")
+        self.url_label.config(text=SERVER_URL)
         self.stop_btn.config(state=tk.NORMAL)
         self.open_btn.config(state=tk.NORMAL)
+        self.profile_btn.config(state=tk.NORMAL)
+        self.report_btn.config(state=tk.NORMAL)
+        self._refresh_profiling_button()
         messagebox.showinfo("Server", "Server started successfully.")
 
     def _on_server_failed(self):
@@ -482,11 +739,74 @@ class DefectDojoLauncher:
         self.start_btn.config(state=tk.NORMAL)
         self.server_running = False
 
-    def stop_server(self):
+    def _request_graceful_shutdown(self, pid):
+        """
+        Ask the server to finish in-flight requests and exit on its own.
+        Returns True if the process exited within GRACEFUL_STOP_TIMEOUT.
+        """
+        try:
+            r = requests.post(SERVER_URL + SHUTDOWN_ENDPOINT, json={}, timeout=3)
+            if r.status_code != 200:
+                return False
+        except Exception:
+            return False
+        start = time.time()
+        while time.time() - start < GRACEFUL_STOP_TIMEOUT:
+            if not self._is_process_alive(pid):
+                return True
+            try:
+                # reap the child so it does not linger as a zombie
+                if self.process and self.process.poll() is not None:
+                    return True
+            except Exception:
+                pass
+            time.sleep(0.2)
+        return False
+
+    def stop_server(self, on_done=None):
+        """
+        Stop the server without blocking the window: the shutdown request,
+        the wait and any kill run in a background thread. `on_done` runs on
+        the Tk thread once the server is gone (also when a stop is already
+        in progress).
+        """
+        if on_done:
+            self._after_stop.append(on_done)
+        if self._stopping:
+            return
         if not self.server_running and not self.pid:
+            self._run_after_stop()
             return
+        self._stopping = True
+        self._set_status_text("Status: Stopping...", "orange")
+        for btn in (self.start_btn, self.stop_btn, self.open_btn, self.profile_btn, self.report_btn):
+            btn.config(state=tk.DISABLED)
+        threading.Thread(target=self._stop_server_thread, args=(self.pid,), daemon=True).start()
+
+    def _stop_server_thread(self, pid):
+        try:
+            self._terminate_server(pid)
+        finally:
+            self.root.after(0, self._on_server_stopped)
+
+    def _on_server_stopped(self):
+        self._stopping = False
+        self._cleanup_after_stop()
+        self._run_after_stop()
+
+    def _run_after_stop(self):
+        callbacks, self._after_stop = self._after_stop, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print("after stop error:", e)
+
+    def _terminate_server(self, pid):
+        # Runs off the Tk thread: no widget access here
         try:
-            pid = self.pid
+            if self._request_graceful_shutdown(pid):
+                return
             try:
                 if self.process:
                     self.process.terminate()
@@ -543,8 +863,6 @@ class DefectDojoLauncher:
                     pass
         except Exception as e:
             print("stop_server error:", e)
-        finally:
-            self._cleanup_after_stop()
 
     def _cleanup_after_stop(self):
         try:
@@ -563,6 +881,8 @@ class DefectDojoLauncher:
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.open_btn.config(state=tk.DISABLED)
+        self.profile_btn.config(state=tk.DISABLED, text="Enable Profiling")
+        self.report_btn.config(state=tk.DISABLED)
 
     def _is_process_alive(self, pid):
         if not pid:
@@ -577,7 +897,61 @@ class DefectDojoLauncher:
 
     def open_browser(self):
         import webbrowser
-        webbrowser.open("http://127.0.0.1:5000")
+        webbrowser.open(SERVER_URL)
+
+    # ---------------- Profiling ----------------
+    def _in_background(self, work, done):
+        """Run work() off the Tk thread, then done(result, error) back on it."""
+        def run():
+            try:
+                result, error = work(), None
+            except Exception as e:
+                result, error = None, e
+            self.root.after(0, lambda: done(result, error))
+        threading.Thread(target=run, daemon=True).start()
+
+    def _refresh_profiling_button(self):
+        def done(data, error):
+            if error or not self.server_running or self._stopping:
+                return
+            self.profile_btn.config(text="Disable Profiling" if data.get("enabled") else "Enable Profiling")
+        self._in_background(lambda: requests.get(SERVER_URL + PROFILING_ENDPOINT, timeout=3).json(), done)
+
+    def toggle_profiling(self):
+        enable = self.profile_btn.cget("text") == "Enable Profiling"
+        self.profile_btn.config(state=tk.DISABLED)
+
+        def work():
+            r = requests.post(SERVER_URL + PROFILING_ENDPOINT, json={"enabled": enable}, timeout=3)
+            data = r.json()
+            if not data.get("success"):
+                raise RuntimeError(data.get("error") or r.status_code)
+            return data
+
+        def done(data, error):
+            if not self.server_running or self._stopping:
+                return  # the stop already reset the button
+            self.profile_btn.config(state=tk.NORMAL)
+            if error:
+                messagebox.showerror("Profiling", f"Could not change profiling: {error}")
+                return
+            self.profile_btn.config(text="Disable Profiling" if data.get("enabled") else "Enable Profiling")
+            if data.get("enabled"):
+                messagebox.showinfo("Profiling", f"Profiling enabled. Reports are written to:\n{data.get('dir')}")
+
+        self._in_background(work, done)
+
+    def open_latest_profile(self):
+        def done(data, error):
+            if error:
+                messagebox.showerror("Profiling", f"Could not reach the server: {error}")
+                return
+            if not data.get("latest"):
+                messagebox.showinfo("Profiling", "No profile reports yet.")
+                return
+            import webbrowser
+            webbrowser.open(SERVER_URL + PROFILE_REPORT_ENDPOINT)
+        self._in_background(lambda: requests.get(SERVER_URL + PROFILING_ENDPOINT, timeout=3).json(), done)
 
     # ---------------- Tray integration ----------------
     def _create_icon_image(self, size=64, text="DD"):
@@ -687,10 +1061,14 @@ class DefectDojoLauncher:
 
     # ---------------- Exit ----------------
     def exit_app(self):
-        if self.server_running:
-            if not messagebox.askyesno("Confirm", "Stop server and exit?"):
+        if self.server_running or self._stopping:
+            if not self._stopping and not messagebox.askyesno("Confirm", "Stop server and exit?"):
                 return
-            self.stop_server()
+            self.stop_server(on_done=self._close_window)
+            return
+        self._close_window()
+
+    def _close_window(self):
         if self.tray_icon:
             try:
                 self.tray_icon.stop()
@@ -1,7 +1,30 @@
-from flask import Flask, render_template, jsonify, request
-import requests
+from flask import Flask, Response, render_template, jsonify, request, g, has_request_context
+import base64
+import copy
+import cProfile
+import csv
+import gzip
+import hashlib
+import io
 import json
-from datetime import datetime
+import os
+import pstats
+import random
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import wraps
+from urllib.parse import urlparse
+from dojo_client import DojoClient, RateLimiter
 
 app = Flask(__name__)
 
@@ -20,6 +43,7 @@ try:
         API_BASE_URL = project_config.get('api_base_url', 'https://demo.defectdojo.org')
 except Exception as e:
     print(f"Error loading project.json: {e}")
+    project_config = {}
     API_BASE_URL = 'https://demo.defectdojo.org'
 
 HEADERS = {
@@ -27,402 +51,727 @@ HEADERS = {
     'Content-Type': 'application/json'
 }
 
+# Shared keep-alive client for all DefectDojo calls (see dojo_client.py)
+HTTP_CONFIG = project_config.get('http', {}) or {}
+dojo = DojoClient(
+    HEADERS,
+    pool_size=HTTP_CONFIG.get('pool_size', 16),
+    max_concurrency=HTTP_CONFIG.get('max_concurrency', 8),
+    retries=HTTP_CONFIG.get('retries', 3),
+    backoff=HTTP_CONFIG.get('backoff', 0.5),
+    timeout=HTTP_CONFIG.get('timeout', 30)
+)
+
 ALLOWED_STATUSES = ['Not Started', 'In Progress', 'On Hold']
 
+# ---------------- Response cache ----------------
+# Read endpoints are cached per route + normalized query args and validated
+# with an ETag derived from the dataset version, so an unchanged payload
+# costs a 304 instead of a rebuild and a re-download.
+RESPONSE_CACHE_SIZE = project_config.get('response_cache_size', 256)
+COMPRESS_MIN_SIZE = 1024
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+
+# Store versions restart at 0 with the process, so ETags from an earlier run must not validate
+BOOT_ID = os.urandom(8).hex()
+
+
+def dataset_version():
+    # Aging depends on today's date, so the day is part of the version
+    return (engagement_store.version, test_store.version, ref_cache.generation,
+            datetime.now().strftime('%Y-%m-%d'))
+
+
+def _etag(key, version):
+    return 'W/"' + hashlib.sha1(repr((BOOT_ID, key, version)).encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, 6)
+
+
+def _negotiate_encoding():
+    offered = ['br', 'gzip'] if brotli else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+class ResponseCache:
+    """LRU of response bodies (plus their compressed variants) per request key."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()  # key -> {'version', 'etag', 'body', encoding -> bytes}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, etag, body):
+        entry = {'version': version, 'etag': etag, 'body': body}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def encoded(self, entry, encoding):
+        body = entry.get(encoding)
+        if body is None:
+            body = entry[encoding] = _compress(entry['body'], encoding)
+        return body
+
+    def invalidate(self, *paths):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in paths]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'not_modified': self.not_modified}
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+def cached_response(view):
+    """Serve a GET endpoint from response_cache with ETag/If-None-Match support."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        version = dataset_version()
+        etag = _etag(key, version)
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response_cache.not_modified += 1
+            response = app.response_class(status=304)
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        entry = response_cache.get(key, version)
+        if entry is None:
+            response_cache.misses += 1
+            # The view may load a snapshot or lookup map (or a sync may land)
+            # while it runs; only a body built at one stable version is cached,
+            # under that version. A load happens once, so a second run is stable.
+            for attempt in range(2):
+                if attempt:
+                    # Report the rerun's timings and partial state only, and count its rows once
+                    g.pop('server_timing', None)
+                    g.pop('partial', None)
+                    g.cache_rerun = True
+                response = app.make_response(view(*args, **kwargs))
+                built_at = dataset_version()
+                if response.status_code != 200 or g.get('partial'):
+                    # Never cache a response built without all of its lookup maps
+                    return response
+                if built_at == version:
+                    break
+                version = built_at
+            else:
+                return response
+            entry = response_cache.put(key, version, _etag(key, version), response.get_data())
+        else:
+            response_cache.hits += 1
+
+        body = entry['body']
+        encoding = _negotiate_encoding() if len(body) >= COMPRESS_MIN_SIZE else None
+        response = app.response_class(
+            response_cache.encoded(entry, encoding) if encoding else body,
+            mimetype='application/json'
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['ETag'] = entry['etag']
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    return wrapper
+
+
+@app.after_request
+def compress_response(response):
+    # Compress the remaining JSON API responses (cached ones arrive encoded)
+    if (request.path.startswith('/api/') and response.mimetype == 'application/json'
+            and 'Content-Encoding' not in response.headers and not response.direct_passthrough
+            and response.status_code == 200):
+        body = response.get_data()
+        if len(body) >= COMPRESS_MIN_SIZE:
+            encoding = _negotiate_encoding()
+            if encoding:
+                response.set_data(_compress(body, encoding))
+                response.headers['Content-Encoding'] = encoding
+                response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.route('/api/response-cache-stats')
+def get_response_cache_stats():
+    return jsonify({'success': True, 'cache': response_cache.stats()})
+
+
 @app.route('/')
 def index():
     return render_template('engagement.html')
 
+def select_engagements(args):
+    """Apply the engagement table filters in `args`; returns (fetched, index, result)."""
+    # Get filter parameters
+    task_name = args.get('task_name', '').lower()
+    status_filter = args.get('status', '')
+    assigned_to = args.get('assigned_to', '')
+    mentor_status = args.get('mentor_status', '')
+    lead_status = args.get('lead_status', '')
+    product_filter = args.get('product', '')
+    created_from = args.get('created_from', '')
+    created_to = args.get('created_to', '')
+    appsec_from = args.get('appsec_eta_from', '')
+    appsec_to = args.get('appsec_eta_to', '')
+    rm_from = args.get('rm_eta_from', '')
+    rm_to = args.get('rm_eta_to', '')
+
+    fetched = fan_out({'index': engagement_index}, optional=('users', 'products'))
+    index = fetched['index']
+    with span('filter'):
+        result = index.select(
+            equal={
+                'status': status_filter,
+                'lead': str(assigned_to),
+                'build_id': mentor_status,
+                'commit_hash': lead_status,
+                'product': str(product_filter)
+            },
+            ranges={
+                'created': (created_from, created_to),
+                'target_start': (appsec_from, appsec_to),
+                'target_end': (rm_from, rm_to)
+            },
+            text=task_name
+        )
+    return fetched, index, result
+
 @app.route('/api/engagements')
+@cached_response
 def get_engagements():
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-
-        # Get filter parameters
-        task_name = request.args.get('task_name', '').lower()
-        status_filter = request.args.get('status', '')
-        assigned_to = request.args.get('assigned_to', '')
-        mentor_status = request.args.get('mentor_status', '')
-        lead_status = request.args.get('lead_status', '')
-        product_filter = request.args.get('product', '')
-        created_from = request.args.get('created_from', '')
-        created_to = request.args.get('created_to', '')
-        appsec_from = request.args.get('appsec_eta_from', '')
-        appsec_to = request.args.get('appsec_eta_to', '')
-        rm_from = request.args.get('rm_eta_from', '')
-        rm_to = request.args.get('rm_eta_to', '')
-
-        api_url = f'{API_BASE_URL}/api/v2/engagements/?limit=1000'
-        response = requests.get(api_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        users_map = get_users_map()
-        products_map = get_products_map()
+        fetched, index, result = select_engagements(request.args)
 
-        all_engagements = []
-        for eng in data.get('results', []) or []:
-            if not eng or eng.get('status') not in ALLOWED_STATUSES:
-                continue
-
-            # Calculate aging
-            created = eng.get('created', '')
-            aging = 0
-            if created:
-                try:
-                    created_date = datetime.strptime(created[:10], '%Y-%m-%d')
-                    aging = (datetime.now() - created_date).days
-                except:
-                    pass
+        try:
+            with span('page'):
+                positions, meta = paginate(index, result, request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
-            lead_id = eng.get('lead')
-            lead_name = users_map.get(lead_id, 'N/A') if lead_id else 'N/A'
+        users_map = fetched['users']
+        products_map = fetched['products']
 
-            product_id = eng.get('product')
-            product_name = products_map.get(product_id, 'N/A') if product_id else 'N/A'
-
-            updated = eng.get('updated', '')
-            if updated:
-                try:
-                    updated_dt = datetime.strptime(updated[:19], '%Y-%m-%dT%H:%M:%S')
-                    updated = updated_dt.strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    updated = updated[:10] if len(updated) >= 10 else updated
-
-            engagement = {
-                'id': eng.get('id'),
-                'created': created[:10] if created else 'N/A',
-                'aging': aging,
-                'name': eng.get('name', 'N/A'),
-                'lead': lead_name,
-                'lead_id': lead_id,
-                'target_start': eng.get('target_start') or 'N/A',
-                'target_end': eng.get('target_end') or 'N/A',
-                'status': eng.get('status', 'N/A'),
-                'build_id': eng.get('build_id') or 'N/A',
-                'commit_hash': eng.get('commit_hash') or 'N/A',
-                'product': product_name,
-                'product_id': product_id,
-                'version': eng.get('version') or 'N/A',
-                'updated': updated,
-                'description': eng.get('description', '')
+        with span('rows'):
+            response = {
+                'success': True,
+                'data': [_engagement_row(index.rows[pos], users_map, products_map) for pos in positions]
             }
-
-            # Apply filters
-            if task_name and task_name not in engagement['name'].lower():
-                continue
-            if status_filter and status_filter != engagement['status']:
-                continue
-            if assigned_to and str(assigned_to) != str(lead_id):
-                continue
-            if mentor_status and mentor_status != engagement['build_id']:
-                continue
-            if lead_status and lead_status != engagement['commit_hash']:
-                continue
-            if product_filter and str(product_filter) != str(product_id):
-                continue
-            if created_from and engagement['created'] != 'N/A':
-                if engagement['created'] < created_from:
-                    continue
-            if created_to and engagement['created'] != 'N/A':
-                if engagement['created'] > created_to:
-                    continue
-            if appsec_from and engagement['target_start'] != 'N/A':
-                if engagement['target_start'] < appsec_from:
-                    continue
-            if appsec_to and engagement['target_start'] != 'N/A':
-                if engagement['target_start'] > appsec_to:
-                    continue
-            if rm_from and engagement['target_end'] != 'N/A':
-                if engagement['target_end'] < rm_from:
-                    continue
-            if rm_to and engagement['target_end'] != 'N/A':
-                if engagement['target_end'] > rm_to:
-                    continue
-
-            all_engagements.append(engagement)
-
-        total = len(all_engagements)
-        start = (page - 1) * limit
-        end = start + limit
-
-        return jsonify({
-            'success': True,
-            'data': all_engagements[start:end],
-            'total': total,
-            'page': page,
-            'limit': limit
-        })
+        response.update(meta)
+        count_rows('engagements', len(index.rows), len(result), len(positions))
+        with span('serialize'):
+            return jsonify(response)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _aging_days(created):
+    aging = 0
+    if created:
+        try:
+            created_date = datetime.strptime(created[:10], '%Y-%m-%d')
+            aging = (datetime.now() - created_date).days
+        except:
+            pass
+    return aging
+
+def _row_aging(row):
+    # Records carry 'created' as a date ordinal, so no parsing per request
+    day = getattr(row, 'created_day', None)
+    if day is not None:
+        return date.today().toordinal() - day
+    return _aging_days(row.get('created', ''))
+
+def _engagement_row(eng, users_map, products_map):
+    created = eng.get('created', '')
+    aging = _row_aging(eng)
+
+    lead_id = eng.get('lead')
+    lead_name = users_map.get(lead_id, 'N/A') if lead_id else 'N/A'
+
+    product_id = eng.get('product')
+    product_name = products_map.get(product_id, 'N/A') if product_id else 'N/A'
+
+    updated = eng.get('updated', '')
+    if updated:
+        try:
+            updated_dt = datetime.strptime(updated[:19], '%Y-%m-%dT%H:%M:%S')
+            updated = updated_dt.strftime('%Y-%m-%d %H:%M:%S')
+        except:
+            updated = updated[:10] if len(updated) >= 10 else updated
+
+    return {
+        'id': eng.get('id'),
+        'created': created[:10] if created else 'N/A',
+        'aging': aging,
+        'name': eng.get('name', 'N/A'),
+        'lead': lead_name,
+        'lead_id': lead_id,
+        'target_start': eng.get('target_start') or 'N/A',
+        'target_end': eng.get('target_end') or 'N/A',
+        'status': eng.get('status', 'N/A'),
+        'build_id': eng.get('build_id') or 'N/A',
+        'commit_hash': eng.get('commit_hash') or 'N/A',
+        'product': product_name,
+        'product_id': product_id,
+        'version': eng.get('version') or 'N/A',
+        'updated': updated,
+        'description': eng.get('description', '')
+    }
+
+def select_tests(args):
+    """Apply the Jira table filters in `args`; returns (fetched, index, result)."""
+    # Get filter parameters
+    title_filter = args.get('title', '').strip().lower()
+    jira_status_filter = args.get('jira_status', '').strip()
+    jira_type_filter = args.get('jira_type', '').strip()
+    analysis_status_filter = args.get('analysis_status', '').strip()
+    assigned_to_filter = args.get('assigned_to', '').strip()
+    build_type_filter = args.get('build_type', '').strip()
+    task_filter = args.get('task', '').strip()
+
+    # Only mcr_jira tests with build_id Pending/On Hold are indexed
+    fetched = fan_out({'index': test_index}, optional=('users', 'engagements', 'environments'))
+    index = fetched['index']
+    with span('filter'):
+        result = index.select(
+            equal={
+                'branch_tag': jira_status_filter,
+                'commit_hash': jira_type_filter,
+                'build_id': analysis_status_filter,
+                'lead': assigned_to_filter,
+                'environment': build_type_filter,
+                'engagement': task_filter
+            },
+            text=title_filter
+        )
+    return fetched, index, result
+
 @app.route('/api/tests')
+@cached_response
 def get_tests():
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-
-        # Get filter parameters
-        title_filter = request.args.get('title', '').strip().lower()
-        jira_status_filter = request.args.get('jira_status', '').strip()
-        jira_type_filter = request.args.get('jira_type', '').strip()
-        analysis_status_filter = request.args.get('analysis_status', '').strip()
-        assigned_to_filter = request.args.get('assigned_to', '').strip()
-        build_type_filter = request.args.get('build_type', '').strip()
-        task_filter = request.args.get('task', '').strip()
-
-        api_url = f'{API_BASE_URL}/api/v2/tests/?limit=1000'
-        response = requests.get(api_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        users_map = get_users_map()
-        engagements_map = get_engagements_map()
-        environments_map = get_environments_map()
-
-        filtered_tests = []
-        for test in data.get('results', []) or []:
-            if not test:
-                continue
-
-            # Must have mcr_jira tag
-            tags = test.get('tags', []) or []
-            has_mcr_jira = any(tag for tag in tags if tag and 'mcr_jira' in str(tag).lower())
-
-            if not has_mcr_jira:
-                continue
-
-            # NEW: Must have build_id = Pending or On Hold
-            build_id = test.get('build_id', '').strip()
-            if build_id not in ['Pending', 'On Hold']:
-                continue
-
-            created = test.get('created', '')
-            if created:
-                try:
-                    created = datetime.strptime(created[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
-                except:
-                    created = created[:10] if len(created) >= 10 else created
-
-            title = test.get('title', '')
-            branch_tag = test.get('branch_tag', '')
-            commit_hash = test.get('commit_hash', '')
-            lead_id = test.get('lead')
-            environment_id = test.get('environment')
-            engagement_id = test.get('engagement')
-
-            # Apply filters
-            if title_filter and title_filter not in title.lower():
-                continue
-
-            if jira_status_filter and jira_status_filter != branch_tag:
-                continue
-
-            if jira_type_filter and jira_type_filter != commit_hash:
-                continue
-
-            if analysis_status_filter and analysis_status_filter != build_id:
-                continue
-
-            if assigned_to_filter and str(assigned_to_filter) != str(lead_id):
-                continue
-
-            if build_type_filter and str(build_type_filter) != str(environment_id):
-                continue
-
-            if task_filter and str(task_filter) != str(engagement_id):
-                continue
-
-            test_obj = {
-                'id': test.get('id'),
-                'created': created,
-                'title': title,
-                'branch_tag': branch_tag,
-                'commit_hash': commit_hash,
-                'build_id': build_id,
-                'lead': users_map.get(lead_id, 'N/A'),
-                'lead_id': lead_id,
-                'environment': environments_map.get(environment_id, 'N/A'),
-                'environment_id': environment_id,
-                'engagement': engagements_map.get(engagement_id, 'N/A'),
-                'engagement_id': engagement_id,
-                'target_start': test.get('target_start', ''),
-                'target_end': test.get('target_end', ''),
-                'test_type': test.get('test_type'),
-                'test_type_name': test.get('test_type_name', '')
+        fetched, index, result = select_tests(request.args)
+
+        try:
+            with span('page'):
+                positions, meta = paginate(index, result, request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        users_map = fetched['users']
+        engagements_map = fetched['engagements']
+        environments_map = fetched['environments']
+
+        with span('rows'):
+            response = {
+                'success': True,
+                'data': [_test_row(index.rows[pos], users_map, engagements_map, environments_map)
+                         for pos in positions]
             }
+        response.update(meta)
+        count_rows('tests', len(index.rows), len(result), len(positions))
+        with span('serialize'):
+            return jsonify(response)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-            filtered_tests.append(test_obj)
+def _test_row(test, users_map, engagements_map, environments_map):
+    created = test.get('created', '')
+    # Records already hold 'created' as YYYY-MM-DD
+    if created and getattr(test, 'created_day', None) is None:
+        try:
+            created = datetime.strptime(created[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+        except:
+            created = created[:10] if len(created) >= 10 else created
+
+    lead_id = test.get('lead')
+    environment_id = test.get('environment')
+    engagement_id = test.get('engagement')
+
+    return {
+        'id': test.get('id'),
+        'created': created,
+        'title': test.get('title', ''),
+        'branch_tag': test.get('branch_tag', ''),
+        'commit_hash': test.get('commit_hash', ''),
+        'build_id': (test.get('build_id') or '').strip(),
+        'lead': users_map.get(lead_id, 'N/A'),
+        'lead_id': lead_id,
+        'environment': environments_map.get(environment_id, 'N/A'),
+        'environment_id': environment_id,
+        'engagement': engagements_map.get(engagement_id, 'N/A'),
+        'engagement_id': engagement_id,
+        'target_start': test.get('target_start', ''),
+        'target_end': test.get('target_end', ''),
+        'test_type': test.get('test_type'),
+        'test_type_name': test.get('test_type_name', '')
+    }
+
+# ---------------- Exports ----------------
+# The filtered tables as CSV or XLSX, built row by row from the index so
+# memory stays flat however many rows match.
+EXPORT_CHUNK_ROWS = 500
+EXPORT_READ_SIZE = 64 * 1024
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
 
-        total = len(filtered_tests)
-        start = (page - 1) * limit
-        end = start + limit
+try:
+    from openpyxl import Workbook
+except Exception:
+    Workbook = None
+
+ENGAGEMENT_EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('name', 'Task Name'),
+    ('created', 'Created'),
+    ('aging', 'Aging (days)'),
+    ('lead', 'Assigned To'),
+    ('status', 'Status'),
+    ('build_id', 'Mentor Status'),
+    ('commit_hash', 'Lead Status'),
+    ('product', 'Product'),
+    ('target_start', 'AppSec ETA'),
+    ('target_end', 'RM ETA'),
+    ('version', 'Version'),
+    ('updated', 'Updated'),
+    ('description', 'Description')
+]
+
+TEST_EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('title', 'Title'),
+    ('created', 'Created'),
+    ('branch_tag', 'Jira Status'),
+    ('commit_hash', 'Jira Type'),
+    ('build_id', 'Analysis Status'),
+    ('lead', 'Assigned To'),
+    ('environment', 'Build Type'),
+    ('engagement', 'Task'),
+    ('target_start', 'Target Start'),
+    ('target_end', 'Target End'),
+    ('test_type_name', 'Test Type')
+]
+
+# Same keys as /api/jira-counts
+JIRA_COUNT_COLUMNS = [
+    ('T', 'Jiras'),
+    ('C', 'Completed'),
+    ('P', 'Pending'),
+    ('S', 'Security'),
+    ('F', 'Functional'),
+    ('D', 'Done'),
+    ('ND', 'Not Done')
+]
+
+
+def _export_positions(index, result, args):
+    """Matching positions in the table's order (the ?sort=&order= args apply)."""
+    sort = args.get('sort', '').strip()
+    order = args.get('order', 'asc').strip().lower()
+    if sort and sort not in index.sort_fields:
+        raise ValueError(f'Unsupported sort field: {sort}')
+    if order not in ('asc', 'desc'):
+        raise ValueError(f'Unsupported sort order: {order}')
+    if not sort:
+        return range(len(index.rows)) if result is index.all else sorted(result)
+    _, positions, _ = index.order(sort)
+    ordered = reversed(positions) if order == 'desc' else positions
+    return (pos for pos in ordered if pos in result)
+
+
+def _safe_cell(value):
+    """Quote text a spreadsheet would otherwise evaluate (titles, tags etc. are user input)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_stream(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # lets Excel detect UTF-8
+    writer.writerow(header)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([_safe_cell(value) for value in row])
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_stream(title, header, rows):
+    # Write-only workbooks keep just the current row in memory; the file is
+    # assembled in a temporary file and streamed from there
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_safe_cell(value) for value in row])
+    spool = tempfile.TemporaryFile()
+    try:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(EXPORT_READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+def export_response(name, columns, rows, fmt):
+    """Stream `rows` (lists in `columns` order) as a CSV or XLSX attachment."""
+    header = [title for _, title in columns]
+    stamp = datetime.now().strftime('%Y%m%d')
+    if fmt == 'xlsx':
+        body = _xlsx_stream(name.title(), header, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = _csv_stream(header, rows)
+        mimetype = 'text/csv'
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={name}_{stamp}.{fmt}',
+        'Cache-Control': 'no-store'
+    })
+
+
+def _export_format(args):
+    fmt = args.get('format', 'csv').strip().lower()
+    if fmt not in ('csv', 'xlsx'):
+        raise ValueError(f'Unsupported export format: {fmt}')
+    if fmt == 'xlsx' and Workbook is None:
+        raise ValueError('XLSX export needs openpyxl (pip install openpyxl); use format=csv')
+    return fmt
+
+
+@app.route('/api/engagements/export')
+def export_engagements():
+    """
+    The filtered engagement table as CSV (default) or ?format=xlsx. Takes the
+    same filter and sort args as /api/engagements; ?jira_counts=1 adds the
+    Jira count columns.
+    """
+    try:
+        fmt = _export_format(request.args)
+        fetched, index, result = select_engagements(request.args)
+        positions = _export_positions(index, result, request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        return jsonify({
-            'success': True,
-            'data': filtered_tests[start:end],
-            'total': total,
-            'page': page,
-            'limit': limit
-        })
+    users_map = fetched['users']
+    products_map = fetched['products']
+    columns = list(ENGAGEMENT_EXPORT_COLUMNS)
+    counts = None
+    if request.args.get('jira_counts', '').lower() in ('1', 'true', 'yes'):
+        # One pass over the tests snapshot for every matching engagement
+        counts = _batched_jira_counts([index.rows[pos].get('id') for pos in result])
+        columns += JIRA_COUNT_COLUMNS
+
+    def rows():
+        for pos in positions:
+            row = _engagement_row(index.rows[pos], users_map, products_map)
+            values = [row[key] for key, _ in ENGAGEMENT_EXPORT_COLUMNS]
+            if counts is not None:
+                eng_counts = counts.get(str(row['id'])) or _empty_jira_counts()
+                values += [eng_counts[key] for key, _ in JIRA_COUNT_COLUMNS]
+            yield values
+
+    count_rows('engagements-export', len(index.rows), len(result), len(result))
+    return export_response('engagements', columns, rows(), fmt)
+
+
+@app.route('/api/tests/export')
+def export_tests():
+    """
+    The filtered Jira table as CSV (default) or ?format=xlsx. Takes the same
+    filter and sort args as /api/tests; ?jira_counts=1 adds the Jira counts
+    of each row's task.
+    """
+    try:
+        fmt = _export_format(request.args)
+        fetched, index, result = select_tests(request.args)
+        positions = _export_positions(index, result, request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+    users_map = fetched['users']
+    engagements_map = fetched['engagements']
+    environments_map = fetched['environments']
+    columns = list(TEST_EXPORT_COLUMNS)
+    counts = None
+    if request.args.get('jira_counts', '').lower() in ('1', 'true', 'yes'):
+        engagement_ids = {index.rows[pos].get('engagement') for pos in result}
+        counts = _batched_jira_counts(sorted(engagement_ids - {None}, key=str))
+        columns += [(key, f'Task {title}') for key, title in JIRA_COUNT_COLUMNS]
+
+    def rows():
+        for pos in positions:
+            row = _test_row(index.rows[pos], users_map, engagements_map, environments_map)
+            values = [row[key] for key, _ in TEST_EXPORT_COLUMNS]
+            if counts is not None:
+                eng_counts = counts.get(str(row['engagement_id'])) or _empty_jira_counts()
+                values += [eng_counts[key] for key, _ in JIRA_COUNT_COLUMNS]
+            yield values
+
+    count_rows('tests-export', len(index.rows), len(result), len(result))
+    return export_response('jiras', columns, rows(), fmt)
+
 @app.route('/api/test-filter-options')
+@cached_response
 def get_test_filter_options():
     try:
-        api_url = f'{API_BASE_URL}/api/v2/tests/?limit=1000'
-        response = requests.get(api_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        users_map = get_users_map()
-        engagements_map = get_engagements_map()
-        environments_map = get_environments_map()
-
-        jira_status_set = set()
-        jira_type_set = set()
-        analysis_status_set = set()
-        assigned_to_dict = {}
-        build_type_dict = {}
-        task_dict = {}
-
-        for test in data.get('results', []) or []:
-            if not test:
-                continue
-
-            tags = test.get('tags', []) or []
-            has_mcr_jira = any(tag for tag in tags if tag and 'mcr_jira' in str(tag).lower())
-
-            if not has_mcr_jira:
-                continue
-
-            # Only include Pending/On Hold tests
-            build_id = test.get('build_id', '').strip()
-            if build_id not in ['Pending', 'On Hold']:
-                continue
-
-            # Collect Jira Status (branch_tag)
-            branch_tag = test.get('branch_tag', '').strip()
-            if branch_tag:
-                jira_status_set.add(branch_tag)
-
-            # Collect Jira Type (commit_hash)
-            commit_hash = test.get('commit_hash', '').strip()
-            if commit_hash:
-                jira_type_set.add(commit_hash)
-
-            # Collect Analysis Status (build_id)
-            if build_id:
-                analysis_status_set.add(build_id)
+        fetched = fan_out({'aggregates': test_aggregates}, optional=('users', 'engagements', 'environments'))
+        agg = fetched['aggregates']
+        users_map = fetched['users']
+        engagements_map = fetched['engagements']
+        environments_map = fetched['environments']
 
-            # Collect Assigned To (lead)
-            lead_id = test.get('lead')
-            if lead_id and lead_id in users_map:
-                assigned_to_dict[lead_id] = users_map[lead_id]
-
-            # Collect Build Type (environment)
-            env_id = test.get('environment')
-            if env_id and env_id in environments_map:
-                build_type_dict[env_id] = environments_map[env_id]
-
-            # Collect Task (engagement)
-            eng_id = test.get('engagement')
-            if eng_id and eng_id in engagements_map:
-                task_dict[eng_id] = engagements_map[eng_id]
+        assigned_to = [{'id': k, 'name': users_map[k]} for k in agg['lead_ids'] if k in users_map]
+        build_type = [{'id': k, 'name': environments_map[k]} for k in agg['environment_ids'] if k in environments_map]
+        task = [{'id': k, 'name': engagements_map[k]} for k in agg['engagement_ids'] if k in engagements_map]
 
         return jsonify({
             'success': True,
-            'jira_status': sorted(list(jira_status_set)),
-            'jira_type': sorted(list(jira_type_set)),
-            'analysis_status': sorted(list(analysis_status_set)),
-            'assigned_to': sorted([{'id': k, 'name': v} for k, v in assigned_to_dict.items()], key=lambda x: x['name']),
-            'build_type': sorted([{'id': k, 'name': v} for k, v in build_type_dict.items()], key=lambda x: x['name']),
-            'task': sorted([{'id': k, 'name': v} for k, v in task_dict.items()], key=lambda x: x['name'])
+            'jira_status': sorted(agg['branch_tags']),
+            'jira_type': sorted(agg['commit_hashes']),
+            'analysis_status': sorted(agg['build_ids']),
+            'assigned_to': sorted(assigned_to, key=lambda x: x['name']),
+            'build_type': sorted(build_type, key=lambda x: x['name']),
+            'task': sorted(task, key=lambda x: x['name'])
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/filter-options')
+@cached_response
 def get_filter_options():
     try:
-        api_url = f'{API_BASE_URL}/api/v2/engagements/?limit=1000'
-        response = requests.get(api_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        users_map = get_users_map()
-        products_map = get_products_map()
+        fetched = fan_out({'aggregates': engagement_aggregates}, optional=('users', 'products'))
+        agg = fetched['aggregates']
+        users_map = fetched['users']
+        products_map = fetched['products']
 
-        results = data.get('results', []) or []
         assigned_to_set = set()
-        mentor_status_set = set()
-        lead_status_set = set()
-        product_set = set()
-
-        for eng in results:
-            if not eng or eng.get('status') not in ALLOWED_STATUSES:
-                continue
+        for lead_id in agg['lead_ids']:
+            lead_name = users_map.get(lead_id)
+            if lead_name and lead_name != 'N/A':
+                assigned_to_set.add((lead_id, lead_name))
 
-            lead_id = eng.get('lead')
-            if lead_id and lead_id in users_map:
-                lead_name = users_map[lead_id]
-                if lead_name and lead_name != 'N/A':
-                    assigned_to_set.add((lead_id, lead_name))
-
-            # NEW: Populate Mentor Status from build_id column
-            build_id = eng.get('build_id')
-            if build_id and build_id != 'N/A':
-                mentor_status_set.add(build_id)
-
-            # NEW: Populate Lead Status from commit_hash column
-            commit_hash = eng.get('commit_hash')
-            if commit_hash and commit_hash != 'N/A':
-                lead_status_set.add(commit_hash)
-
-            product_id = eng.get('product')
-            if product_id and product_id in products_map:
-                product_name = products_map[product_id]
-                if product_name and product_name != 'N/A':
-                    product_set.add((product_id, product_name))
+        product_set = set()
+        for product_id in agg['product_ids']:
+            product_name = products_map.get(product_id)
+            if product_name and product_name != 'N/A':
+                product_set.add((product_id, product_name))
 
         return jsonify({
             'success': True,
             'assigned_to': sorted([{'id': aid, 'name': name} for aid, name in assigned_to_set], key=lambda x: x['name']),
-            'mentor_status': sorted(list(mentor_status_set)),
-            'lead_status': sorted(list(lead_status_set)),
+            'mentor_status': sorted(agg['build_ids']),
+            'lead_status': sorted(agg['commit_hashes']),
             'products': sorted([{'id': pid, 'name': name} for pid, name in product_set], key=lambda x: x['name'])
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _engagement_payload(data):
+    payload = {
+        'name': data.get('name'),
+        'target_start': data.get('target_start'),
+        'target_end': data.get('target_end'),
+        'lead': int(data.get('lead')),
+        'product': int(data.get('product'))
+    }
+
+    if data.get('status'):
+        payload['status'] = data.get('status')
+    if data.get('build_id'):
+        payload['build_id'] = data.get('build_id')
+    if data.get('commit_hash'):
+        payload['commit_hash'] = data.get('commit_hash')
+    if data.get('version'):
+        payload['version'] = data.get('version')
+    if 'description' in data:
+        payload['description'] = data.get('description')
+    return payload
+
+def _test_payload(data):
+    payload = {
+        'title': data.get('title'),
+        'target_start': data.get('target_start'),
+        'target_end': data.get('target_end'),
+        'test_type_name': data.get('test_type_name'),
+        'engagement': int(data.get('engagement')),
+        'lead': int(data.get('lead')),
+        'test_type': int(data.get('test_type')),
+        'environment': int(data.get('environment'))
+    }
+
+    if data.get('build_id'):
+        payload['build_id'] = data.get('build_id')
+    return payload
+
+def _put_engagement(engagement_id, data):
+    api_url = f'{API_BASE_URL}/api/v2/engagements/{engagement_id}/'
+    response = dojo.put(api_url, json=_engagement_payload(data))
+    response.raise_for_status()
+    _write_through(engagement_store, response)
+
+def _put_test(test_id, data):
+    api_url = f'{API_BASE_URL}/api/v2/tests/{test_id}/'
+    response = dojo.put(api_url, json=_test_payload(data))
+    response.raise_for_status()
+    _write_through(test_store, response)
+
+def _engagements_changed():
+    # Engagement names feed the Task column of the Jiras table
+    ref_cache.invalidate('engagements')
+    response_cache.invalidate('/api/engagements', '/api/filter-options', '/api/summary/engagements',
+                              '/api/tests', '/api/test-filter-options')
+
+def _tests_changed():
+    response_cache.invalidate('/api/tests', '/api/test-filter-options', '/api/summary/jiras')
+
 @app.route('/api/engagement/<int:engagement_id>', methods=['PUT'])
 def update_engagement(engagement_id):
     try:
-        data = request.get_json()
-        payload = {
-            'name': data.get('name'),
-            'target_start': data.get('target_start'),
-            'target_end': data.get('target_end'),
-            'lead': int(data.get('lead')),
-            'product': int(data.get('product'))
-        }
-
-        if data.get('status'):
-            payload['status'] = data.get('status')
-        if data.get('build_id'):
-            payload['build_id'] = data.get('build_id')
-        if data.get('commit_hash'):
-            payload['commit_hash'] = data.get('commit_hash')
-        if data.get('version'):
-            payload['version'] = data.get('version')
-        if 'description' in data:
-            payload['description'] = data.get('description')
-
-        api_url = f'{API_BASE_URL}/api/v2/engagements/{engagement_id}/'
-        response = requests.put(api_url, headers=HEADERS, json=payload, timeout=30)
-        response.raise_for_status()
+        _put_engagement(engagement_id, request.get_json())
+        _engagements_changed()
 
         return jsonify({'success': True, 'message': 'Updated successfully'})
     except Exception as e:
@@ -431,107 +780,219 @@ def update_engagement(engagement_id):
 @app.route('/api/test/<int:test_id>', methods=['PUT'])
 def update_test(test_id):
     try:
-        data = request.get_json()
-        payload = {
-            'title': data.get('title'),
-            'target_start': data.get('target_start'),
-            'target_end': data.get('target_end'),
-            'test_type_name': data.get('test_type_name'),
-            'engagement': int(data.get('engagement')),
-            'lead': int(data.get('lead')),
-            'test_type': int(data.get('test_type')),
-            'environment': int(data.get('environment'))
-        }
+        _put_test(test_id, request.get_json())
+        _tests_changed()
 
-        if data.get('build_id'):
-            payload['build_id'] = data.get('build_id')
+        return jsonify({'success': True, 'message': 'Updated successfully'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        api_url = f'{API_BASE_URL}/api/v2/tests/{test_id}/'
-        response = requests.put(api_url, headers=HEADERS, json=payload, timeout=30)
-        response.raise_for_status()
+# Bulk edits: concurrent PUTs, throttled so a large batch cannot flood DefectDojo
+BULK_CONFIG = project_config.get('bulk', {}) or {}
+BULK_WORKERS = BULK_CONFIG.get('workers', 4)
+BULK_RATE = BULK_CONFIG.get('rate', 5)  # PUTs per second
+BULK_MAX_ITEMS = BULK_CONFIG.get('max_items', 500)
+
+bulk_limiter = RateLimiter(BULK_RATE)
+
+def _bulk_items(data, store):
+    """
+    Expand a bulk request into (id, data) pairs. Either
+      {"items": [{"id": 1, ...full row fields...}, ...]}
+    or
+      {"ids": [1, 2, ...], "changes": {"build_id": "On Hold"}}
+    where each id's current fields come from the local snapshot.
+    """
+    if 'items' in data:
+        # Non-object items keep their slot and fail on their own in _run_bulk
+        return [(item.get('id') if isinstance(item, dict) else None, item) for item in data.get('items') or []]
+
+    changes = data.get('changes') or {}
+    rows = {row.get('id'): row for row in store.rows()}
+    items = []
+    for item_id in data.get('ids') or []:
+        row = rows.get(_bulk_id(item_id))
+        items.append((item_id, dict(row, **changes) if row else None))
+    return items
+
+def _bulk_id(value):
+    # Ids end up in the upstream URL; only accept positive integers
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.isascii() and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, int) and value > 0:
+        return value
+    return None
+
+def _run_bulk(items, put):
+    def run(item):
+        raw_id, item_data = item
+        started = time.time()
+        result = {'id': raw_id}
+        try:
+            if item_data is not None and not isinstance(item_data, dict):
+                raise ValueError('Item must be an object')
+            if raw_id is None:
+                raise ValueError('Missing id')
+            item_id = _bulk_id(raw_id)
+            if item_id is None:
+                raise ValueError('Invalid id')
+            if item_data is None:
+                raise ValueError('Unknown id')
+            bulk_limiter.acquire()
+            put(item_id, item_data)
+            result['success'] = True
+        except Exception as e:
+            result['success'] = False
+            result['error'] = str(e)
+        result['elapsed_ms'] = round((time.time() - started) * 1000, 1)
+        return result
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(BULK_WORKERS, len(items)))) as pool:
+        return list(pool.map(run, items))
+
+def _bulk_response(results, started):
+    failed = sum(1 for r in results if not r['success'])
+    response = {
+        'success': failed == 0,
+        'results': results,
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'elapsed_ms': round((time.time() - started) * 1000, 1)
+    }
+    if failed:
+        response['error'] = f'{failed} of {len(results)} updates failed'
+    return jsonify(response)
+
+@app.route('/api/engagements/bulk', methods=['POST'])
+def bulk_update_engagements():
+    try:
+        started = time.time()
+        items = _bulk_items(request.get_json() or {}, engagement_store)
+        if len(items) > BULK_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'At most {BULK_MAX_ITEMS} items per request'}), 400
+
+        results = _run_bulk(items, _put_engagement)
+        if any(r['success'] for r in results):
+            _engagements_changed()
+        return _bulk_response(results, started)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        return jsonify({'success': True, 'message': 'Updated successfully'})
+@app.route('/api/tests/bulk', methods=['POST'])
+def bulk_update_tests():
+    try:
+        started = time.time()
+        items = _bulk_items(request.get_json() or {}, test_store)
+        if len(items) > BULK_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'At most {BULK_MAX_ITEMS} items per request'}), 400
+
+        results = _run_bulk(items, _put_test)
+        if any(r['success'] for r in results):
+            _tests_changed()
+        return _bulk_response(results, started)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Per-engagement requests in flight when /api/jira-counts cannot batch
+JIRA_COUNTS_WORKERS = project_config.get('jira_counts_workers', 8)
+
+def _empty_jira_counts():
+    return {'T': 0, 'C': 0, 'P': 0, 'S': 0, 'F': 0, 'D': 0, 'ND': 0}
+
+def _add_jira_count(counts, test):
+    if not _has_mcr_jira(test):
+        return
+
+    counts['T'] += 1
+
+    build_id = str(test.get('build_id', '')).strip().lower()
+    commit_hash = str(test.get('commit_hash', '')).strip().lower()
+    branch = str(test.get('branch_tag', '')).strip().lower()
+
+    if build_id in ['approved', 'rejected']:
+        counts['C'] += 1
+    if build_id in ['pending', 'on hold']:
+        counts['P'] += 1
+    if commit_hash == 'security':
+        counts['S'] += 1
+    if commit_hash and commit_hash != 'security':
+        counts['F'] += 1
+    if branch in ['ready for testing', 'ready for security', 'done']:
+        counts['D'] += 1
+    if branch and branch not in ['ready for testing', 'ready for security', 'done']:
+        counts['ND'] += 1
+
+def _batched_jira_counts(engagement_ids):
+    # One pass over the test snapshot, grouped by engagement
+    results = {str(eng_id): _empty_jira_counts() for eng_id in engagement_ids}
+    for test in test_store.rows():
+        counts = results.get(str(test.get('engagement')))
+        if counts is not None:
+            _add_jira_count(counts, test)
+    return results
+
+def _engagement_jira_counts(eng_id):
+    counts = _empty_jira_counts()
+    params, _ = plan_query('/api/v2/tests/', [('eq', 'engagement', eng_id), ('contains', 'tags', 'mcr_jira')])
+    for test in iter_collection('/api/v2/tests/', params):
+        _add_jira_count(counts, test)
+    return counts
+
+def _parallel_jira_counts(engagement_ids):
+    if not engagement_ids:
+        return {}
+    workers = max(1, min(JIRA_COUNTS_WORKERS, len(engagement_ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = pool.map(_engagement_jira_counts, engagement_ids)
+        return {str(eng_id): c for eng_id, c in zip(engagement_ids, counts)}
+
 @app.route('/api/jira-counts', methods=['POST'])
 def get_jira_counts():
     try:
+        started = time.time()
         data = request.get_json()
         engagement_ids = data.get('engagement_ids', [])
 
-        results = {}
-        for eng_id in engagement_ids:
-            api_url = f'{API_BASE_URL}/api/v2/tests/?engagement={eng_id}&limit=1000'
-            response = requests.get(api_url, headers=HEADERS, timeout=30)
-            tests = response.json().get('results', []) or []
-
-            counts = {'T': 0, 'C': 0, 'P': 0, 'S': 0, 'F': 0, 'D': 0, 'ND': 0}
-
-            for test in tests:
-                if not test:
-                    continue
-                tags = test.get('tags', []) or []
-                if not any(tag for tag in tags if tag and 'mcr_jira' in str(tag).lower()):
-                    continue
-
-                counts['T'] += 1
-
-                build_id = str(test.get('build_id', '')).strip().lower()
-                commit_hash = str(test.get('commit_hash', '')).strip().lower()
-                branch = str(test.get('branch_tag', '')).strip().lower()
-
-                if build_id in ['approved', 'rejected']:
-                    counts['C'] += 1
-                if build_id in ['pending', 'on hold']:
-                    counts['P'] += 1
-                if commit_hash == 'security':
-                    counts['S'] += 1
-                if commit_hash and commit_hash != 'security':
-                    counts['F'] += 1
-                if branch in ['ready for testing', 'ready for security', 'done']:
-                    counts['D'] += 1
-                if branch and branch not in ['ready for testing', 'ready for security', 'done']:
-                    counts['ND'] += 1
-
-            results[str(eng_id)] = counts
-
-        return jsonify({'success': True, 'counts': results})
+        try:
+            with span('count'):
+                results = _batched_jira_counts(engagement_ids)
+            mode = 'batched'
+            count_rows('jira-counts', len(test_store.rows()), len(results), len(results))
+        except Exception as e:
+            print(f"Batched Jira counts unavailable, querying per engagement: {e}")
+            with span('count'):
+                results = _parallel_jira_counts(engagement_ids)
+            mode = 'parallel'
+
+        with span('serialize'):
+            return jsonify({
+                'success': True,
+                'counts': results,
+                'mode': mode,
+                'elapsed_ms': round((time.time() - started) * 1000, 1)
+            })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/summary/engagements')
+@cached_response
 def get_engagement_summary():
     try:
-        api_url = f'{API_BASE_URL}/api/v2/engagements/?limit=1000'
-        response = requests.get(api_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        users_map = get_users_map()
+        fetched = fan_out({'aggregates': engagement_aggregates}, optional=('users',))
+        agg = fetched['aggregates']
+        users_map = fetched['users']
 
-        # NEW: Count by lead and status (3 columns)
+        # Count by lead and status (3 columns); leads sharing a name are merged
         lead_status_counts = {}
-
-        for eng in data.get('results', []) or []:
-            if not eng or eng.get('status') not in ALLOWED_STATUSES:
-                continue
-
-            lead_id = eng.get('lead')
-            if not lead_id:
-                continue
-
+        for lead_id, counts in agg['lead_status'].items():
             lead_name = users_map.get(lead_id, 'Unknown')
-            status = eng.get('status')
-
-            if lead_name not in lead_status_counts:
-                lead_status_counts[lead_name] = {
-                    'Not Started': 0,
-                    'In Progress': 0,
-                    'On Hold': 0
-                }
-
-            lead_status_counts[lead_name][status] += 1
+            merged = lead_status_counts.setdefault(lead_name, {status: 0 for status in ALLOWED_STATUSES})
+            for status, count in counts.items():
+                merged[status] += count
 
         # Format for display
         summary = []
@@ -562,51 +1023,25 @@ def get_engagement_summary():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/summary/jiras')
+@cached_response
 def get_jira_summary():
     try:
-        tests_url = f'{API_BASE_URL}/api/v2/tests/?limit=1000'
-        tests_response = requests.get(tests_url, headers=HEADERS, timeout=30)
-        tests_response.raise_for_status()
-        tests_data = tests_response.json()
-
-        users_map = get_users_map()
-        environments_map = get_environments_map()
+        fetched = fan_out({'aggregates': test_aggregates}, optional=('users', 'environments'))
+        agg = fetched['aggregates']
+        users_map = fetched['users']
+        environments_map = fetched['environments']
 
-        # NEW: Count by lead, environment, AND build_id (Pending/On Hold sub-columns)
+        # Count by lead, environment and build_id (Pending/On Hold sub-columns)
         env_ids = set()
         lead_env_build_counts = {}
-
-        for test in tests_data.get('results', []) or []:
-            if not test:
-                continue
-
-            tags = test.get('tags', []) or []
-            has_mcr_jira = any(tag for tag in tags if tag and 'mcr_jira' in str(tag).lower())
-            if not has_mcr_jira:
-                continue
-
-            build_id = test.get('build_id', '').strip()
-            if build_id not in ['Pending', 'On Hold']:
-                continue
-
-            lead_id = test.get('lead')
-            env_id = test.get('environment')
-
-            if not lead_id or not env_id:
-                continue
-
+        for (lead_id, env_id), counts in agg['lead_env_build'].items():
             env_ids.add(env_id)
             lead_name = users_map.get(lead_id, 'Unknown')
+            merged = lead_env_build_counts.setdefault(lead_name, {}).setdefault(env_id, {'Pending': 0, 'On Hold': 0})
+            for build_id, count in counts.items():
+                merged[build_id] += count
 
-            if lead_name not in lead_env_build_counts:
-                lead_env_build_counts[lead_name] = {}
-
-            if env_id not in lead_env_build_counts[lead_name]:
-                lead_env_build_counts[lead_name][env_id] = {'Pending': 0, 'On Hold': 0}
-
-            lead_env_build_counts[lead_name][env_id][build_id] += 1
-
-        env_list = sorted([{'id': eid, 'name': environments_map.get(eid, 'Unknown')} 
+        env_list = sorted([{'id': eid, 'name': environments_map.get(eid, 'Unknown')}
                           for eid in env_ids], key=lambda x: x['name'])
 
         # Format data
@@ -648,56 +1083,2195 @@ def get_jira_summary():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def get_users_map():
-    try:
-        response = requests.get(f'{API_BASE_URL}/api/v2/users/?limit=1000', headers=HEADERS, timeout=30)
-        users = response.json().get('results', []) or []
+# ---------------- Upstream pagination ----------------
+# DefectDojo pages its list endpoints; every collection is read through
+# iter_collection so nothing past the first page is silently dropped.
+PAGE_SIZE = project_config.get('page_size', 250)
+PAGE_CONCURRENCY = project_config.get('page_concurrency', 4)
+
+
+def _get_page(url, params=None):
+    response = dojo.get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def _page_rows(page):
+    return [row for row in page.get('results', []) or [] if row]
+
+
+def iter_collection(path, params=None, page_size=None, concurrency=None):
+    """
+    Yield every row of a DefectDojo list endpoint.
+    The first page gives the total count; the remaining pages are fetched
+    concurrently (at most `concurrency` in flight) and yielded in order, so
+    callers can start filtering before the last page arrives. Any rows added
+    after the count was taken are picked up by following the 'next' links.
+    With concurrency=1 the 'next' links are followed one page at a time,
+    which lets a caller stop early without fetching the rest.
+    """
+    page_size = page_size or PAGE_SIZE
+    concurrency = concurrency or PAGE_CONCURRENCY
+    url = f'{API_BASE_URL}{path}'
+    query = dict(params or {})
+    query['limit'] = page_size
+
+    page = _get_page(url, dict(query, offset=0))
+    yield from _page_rows(page)
+    next_url = page.get('next')
+    count = page.get('count')
+    # DefectDojo may cap limit below page_size; step by what it actually returned
+    stride = len(page.get('results') or [])
+
+    if next_url and concurrency > 1 and isinstance(count, int) and stride:
+        offsets = iter(range(stride, count, stride))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = deque()
+            for offset in offsets:
+                pending.append(pool.submit(_get_page, url, dict(query, offset=offset)))
+                if len(pending) >= concurrency:
+                    break
+            while pending:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(pool.submit(_get_page, url, dict(query, offset=offset)))
+                yield from _page_rows(page)
+        next_url = page.get('next')
+
+    while next_url:
+        page = _get_page(next_url)
+        yield from _page_rows(page)
+        next_url = page.get('next')
+
+
+def upstream_count(path, params=None):
+    """Total rows DefectDojo has for `path` with `params`, from a one-row page."""
+    page = _get_page(f'{API_BASE_URL}{path}', dict(params or {}, limit=1, offset=0))
+    return page.get('count')
+
+
+# ---------------- Query pushdown ----------------
+# Predicates are (op, field, value) tuples. Those DefectDojo can evaluate are
+# sent as its native filter parameters; only the rest are checked in Python.
+# DefectDojo's tag filter is a case-insensitive 'contains', like _has_mcr_jira.
+UPSTREAM_FILTERS = {
+    '/api/v2/tests/': {
+        ('contains', 'tags'): 'tag',
+        ('eq', 'engagement'): 'engagement'
+    }
+}
 
-        users_map = {}
-        for user in users:
-            if not user:
-                continue
-            user_id = user.get('id')
-            first_name = user.get('first_name', '') or ''
-            last_name = user.get('last_name', '') or ''
-            full_name = f"{first_name} {last_name}".strip() or user.get('username', 'N/A')
-            users_map[user_id] = full_name
-
-        return users_map
-    except:
+
+def _matches(row, predicate):
+    op, field, value = predicate
+    actual = row.get(field)
+    if op == 'eq':
+        return actual == value
+    if op == 'contains':
+        # Lists (tags) match if any element contains the value
+        values = actual if isinstance(actual, (list, tuple)) else [actual]
+        return any(item and value.lower() in str(item).lower() for item in values)
+    raise ValueError(f'Unknown predicate: {op}')
+
+
+def plan_query(path, predicates):
+    """
+    Return (params, residual): DefectDojo query params for the predicates the
+    endpoint supports and the predicates left to check in Python.
+    """
+    supported = UPSTREAM_FILTERS.get(path, {})
+    params, residual = {}, []
+    for predicate in predicates:
+        op, field, value = predicate
+        param = supported.get((op, field))
+        if param and param not in params:
+            params[param] = value
+        else:
+            residual.append(predicate)
+    return params, residual
+
+
+def residual_filter(residual):
+    """Predicate function for the rows DefectDojo could not filter for us."""
+    if not residual:
+        return None
+    return lambda row: all(_matches(row, predicate) for predicate in residual)
+
+
+# ---------------- Reference data cache ----------------
+# Lookup maps (id -> display name) change rarely, so they are kept in-process
+# and shared by every request instead of being re-downloaded per call.
+REF_CACHE_TTL = {
+    'users': 300,
+    'products': 300,
+    'engagements': 60,
+    'environments': 600
+}
+REF_CACHE_TTL.update(project_config.get('cache_ttl', {}) or {})
+
+# How long past its TTL an entry may still be served while it is refreshed
+REF_CACHE_MAX_STALE = project_config.get('cache_max_stale', 3600)
+
+
+class RefCache:
+    """
+    TTL cache for the reference lookup maps.
+    - single-flight: concurrent misses for the same entity share one upstream fetch
+    - stale-while-revalidate: an expired entry is served while a background refresh runs
+    - hit/miss/stale counters and entry age are exposed through stats()
+    """
+
+    def __init__(self, ttls, max_stale):
+        self.ttls = ttls
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._entries = {}   # name -> (value, loaded_at)
+        self._inflight = {}  # name -> threading.Event for the running load
+        self._stats = {}
+        self.generation = 0  # bumped whenever any cached map changes
+        self._errors = {}    # name -> last load error
+        # name -> (value, loaded_at) from a previous run, or None
+        self.warm_loader = None
+
+    def _stat(self, name, key):
+        counters = self._stats.setdefault(name, {'hits': 0, 'stale_hits': 0, 'misses': 0,
+                                                 'refreshes': 0, 'errors': 0, 'warm_starts': 0})
+        counters[key] += 1
+
+    def get(self, name, loader, strict=False):
+        """
+        Return the cached map for `name`, loading it with `loader` if needed.
+        On a failed load an empty map is returned, or with strict=True the
+        error is raised so the caller can report partial results.
+        """
+        ttl = self.ttls.get(name, 60)
+        with self._lock:
+            entry = self._entries.get(name)
+            now = time.time()
+            if entry:
+                age = now - entry[1]
+                if age < ttl:
+                    self._stat(name, 'hits')
+                    return entry[0]
+                if age < ttl + self.max_stale:
+                    self._stat(name, 'stale_hits')
+                    if name not in self._inflight:
+                        self._inflight[name] = threading.Event()
+                        threading.Thread(target=self._load, args=(name, loader), daemon=True).start()
+                    return entry[0]
+            self._stat(name, 'misses')
+            event = self._inflight.get(name)
+            owner = event is None
+            if owner:
+                event = self._inflight[name] = threading.Event()
+
+        if owner:
+            if not self._warm_start(name, loader, ttl):
+                self._load(name, loader)
+        else:
+            event.wait(30)
+
+        with self._lock:
+            entry = self._entries.get(name)
+            error = self._errors.get(name)
+        if entry:
+            return entry[0]
+        if strict:
+            raise RuntimeError(f"{name} map unavailable: {error or 'timed out'}")
         return {}
 
-def get_products_map():
+    def _warm_start(self, name, loader, ttl):
+        # Seed a missing entry from the previous run, refreshing it in the background if expired
+        saved = self.warm_loader(name) if self.warm_loader else None
+        if saved is None:
+            return False
+        value, loaded_at = saved
+        now = time.time()
+        refresh = now - loaded_at >= ttl
+        with self._lock:
+            # An old entry counts as just expired, so it is served stale until the refresh lands
+            self._entries[name] = (value, now - ttl if refresh else loaded_at)
+            self.generation += 1
+            self._stat(name, 'warm_starts')
+            event = self._inflight.pop(name, None)
+            if refresh:
+                self._inflight[name] = threading.Event()
+        if event:
+            event.set()
+        if refresh:
+            threading.Thread(target=self._load, args=(name, loader), daemon=True).start()
+        return True
+
+    def export(self, name):
+        """Return (value, loaded_at) for a cached map, or None."""
+        with self._lock:
+            return self._entries.get(name)
+
+    def _load(self, name, loader):
+        try:
+            value = loader()
+            with self._lock:
+                previous = self._entries.get(name)
+                if previous is None or previous[0] != value:
+                    self.generation += 1
+                self._entries[name] = (value, time.time())
+                self._errors.pop(name, None)
+                self._stat(name, 'refreshes')
+        except Exception as e:
+            print(f"Error refreshing {name} map: {e}")
+            with self._lock:
+                self._errors[name] = str(e)
+                self._stat(name, 'errors')
+        finally:
+            with self._lock:
+                event = self._inflight.pop(name, None)
+            if event:
+                event.set()
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+            self.generation += 1
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            result = {}
+            for name in self.ttls:
+                entry = self._entries.get(name)
+                result[name] = dict(self._stats.get(name, {'hits': 0, 'stale_hits': 0, 'misses': 0,
+                                                           'refreshes': 0, 'errors': 0, 'warm_starts': 0}))
+                result[name]['ttl'] = self.ttls[name]
+                result[name]['age'] = round(now - entry[1], 1) if entry else None
+                result[name]['size'] = len(entry[0]) if entry else 0
+            return result
+
+
+ref_cache = RefCache(REF_CACHE_TTL, REF_CACHE_MAX_STALE)
+
+
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    return jsonify({'success': True, 'cache': ref_cache.stats()})
+
+
+def _load_users_map():
+    users_map = {}
+    for user in iter_collection('/api/v2/users/'):
+        user_id = user.get('id')
+        first_name = user.get('first_name', '') or ''
+        last_name = user.get('last_name', '') or ''
+        full_name = f"{first_name} {last_name}".strip() or user.get('username', 'N/A')
+        users_map[user_id] = full_name
+
+    return users_map
+
+def _load_products_map():
+    return {p.get('id'): p.get('name', 'N/A') for p in iter_collection('/api/v2/products/')}
+
+def _load_engagements_map():
+    return {e.get('id'): e.get('name', 'N/A') for e in engagement_store.rows()}
+
+def _load_environments_map():
+    environments = iter_collection('/api/v2/development_environments/')
+    return {e.get('id'): e.get('name', 'N/A') for e in environments}
+
+def get_users_map(strict=False):
+    return ref_cache.get('users', _load_users_map, strict)
+
+def get_products_map(strict=False):
+    return ref_cache.get('products', _load_products_map, strict)
+
+def get_engagements_map(strict=False):
+    return ref_cache.get('engagements', _load_engagements_map, strict)
+
+def get_environments_map(strict=False):
+    return ref_cache.get('environments', _load_environments_map, strict)
+
+# ---------------- Upstream fan-out ----------------
+# Views that need several collections start every fetch at once, so a cold
+# request costs the slowest fetch instead of the sum of all of them.
+FANOUT_DEADLINE = project_config.get('fanout_deadline', 25)
+FANOUT_WORKERS = project_config.get('fanout_workers', 16)
+
+fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='fanout')
+
+# Lookup maps a view can do without: a failure leaves names as 'N/A'
+OPTIONAL_FETCHES = {
+    'users': lambda: get_users_map(strict=True),
+    'products': lambda: get_products_map(strict=True),
+    'engagements': lambda: get_engagements_map(strict=True),
+    'environments': lambda: get_environments_map(strict=True)
+}
+
+
+def _timed(fn):
+    started = time.time()
+    value = fn()
+    return value, (time.time() - started) * 1000
+
+
+class _InlineResult:
+    """Future-like wrapper that runs `fn` when its result is asked for."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def result(self, timeout=None):
+        return _timed(self.fn)
+
+
+def fan_out(required=None, optional=(), deadline=None):
+    """
+    Run `required` (name -> callable) and the named OPTIONAL_FETCHES
+    concurrently, waiting at most `deadline` seconds in total.
+    Returns a dict of results. A failed or late required fetch raises; a
+    failed or late optional one is replaced by {} and listed in
+    g.partial. Per-fetch durations are recorded in g.server_timing.
+    """
+    tasks = dict(required or {})
+    tasks.update({name: OPTIONAL_FETCHES[name] for name in optional})
+    if g.get('profiler'):
+        # A profiled request runs its fetches inline so the profile sees their work
+        futures = {name: _InlineResult(fn) for name, fn in tasks.items()}
+    else:
+        futures = {name: fanout_pool.submit(_timed, fn) for name, fn in tasks.items()}
+    until = time.time() + (deadline or FANOUT_DEADLINE)
+
+    results = {}
+    timings = g.setdefault('server_timing', [])
+    partial = g.setdefault('partial', [])
+    for name, future in futures.items():
+        try:
+            results[name], elapsed = future.result(timeout=max(0, until - time.time()))
+            timings.append((name, elapsed))
+        except Exception as e:
+            if name in (required or {}):
+                raise
+            print(f"Fetching {name} failed, serving partial results: {str(e) or 'deadline exceeded'}")
+            results[name] = {}
+            partial.append(name)
+    return results
+
+
+# ---------------- Instrumentation ----------------
+# Spans go to the Server-Timing header of the current response; counters
+# and histograms are served in Prometheus text format on /metrics.
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Metrics:
+    """
+    Minimal Prometheus registry: labelled counters and histograms kept in
+    process, plus collectors that read gauges and external stats at scrape
+    time.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.help = {}
+        self.collectors = []  # fn() -> [(name, type, [(labels, value), ...]), ...]
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-2] += seconds
+            counts[-1] += 1
+
+    def render(self):
+        lines = []
+
+        def header(name, kind):
+            if name in self.help:
+                lines.append(f'# HELP {name} {self.help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {labels: list(c) for labels, c in series.items()}
+                          for name, series in self._histograms.items()}
+
+        for name in sorted(counters):
+            header(name, 'counter')
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f'{name}{_label_text(labels)} {value}')
+        for name in sorted(histograms):
+            header(name, 'histogram')
+            for labels, counts in sorted(histograms[name].items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'{name}_bucket{_label_text(labels + (("le", str(bound)),))} {count}')
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", "+Inf"),))} {counts[-1]}')
+                lines.append(f'{name}_sum{_label_text(labels)} {counts[-2]:.6f}')
+                lines.append(f'{name}_count{_label_text(labels)} {counts[-1]}')
+        for collect in self.collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, samples in families:
+                header(name, kind)
+                for labels, value in samples:
+                    lines.append(f'{name}{_label_text(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+metrics = Metrics(METRIC_BUCKETS)
+metrics.describe('dojo_upstream_request_seconds', 'DefectDojo call latency per attempt, by path template')
+metrics.describe('dojo_upstream_requests_total', 'DefectDojo call attempts by path template and status')
+metrics.describe('dashboard_request_seconds', 'Time to build a response, by route')
+metrics.describe('dashboard_requests_total', 'Responses by route and status')
+metrics.describe('dashboard_rows_scanned_total', 'Rows the filters ran over')
+metrics.describe('dashboard_rows_matched_total', 'Rows that passed the filters')
+metrics.describe('dashboard_rows_returned_total', 'Rows materialized into responses')
+
+
+@contextmanager
+def span(name):
+    """Time a phase of the current request and report it in Server-Timing."""
+    started = time.perf_counter()
     try:
-        response = requests.get(f'{API_BASE_URL}/api/v2/products/?limit=1000', headers=HEADERS, timeout=30)
-        products = response.json().get('results', []) or []
-        return {p.get('id'): p.get('name', 'N/A') for p in products if p}
-    except:
-        return {}
+        yield
+    finally:
+        if has_request_context():
+            g.setdefault('server_timing', []).append((name, (time.perf_counter() - started) * 1000))
+
+
+def count_rows(endpoint, scanned, matched, returned):
+    if has_request_context() and g.get('cache_rerun'):
+        # cached_response already counted this request's first pass
+        return
+    labels = (('endpoint', endpoint),)
+    metrics.inc('dashboard_rows_scanned_total', labels, scanned)
+    metrics.inc('dashboard_rows_matched_total', labels, matched)
+    metrics.inc('dashboard_rows_returned_total', labels, returned)
+
+
+def _upstream_path(url):
+    # /api/v2/tests/123/ -> /api/v2/tests/{id}/ so ids do not explode the label set
+    parts = urlparse(url).path.split('/')
+    return '/'.join('{id}' if part.isdigit() else part for part in parts)
+
+
+def _observe_upstream(method, url, status, seconds):
+    path = _upstream_path(url)
+    metrics.observe('dojo_upstream_request_seconds', seconds, (('method', method), ('path', path)))
+    metrics.inc('dojo_upstream_requests_total',
+                (('method', method), ('path', path), ('status', str(status or 'error'))))
+    if has_request_context():
+        g.upstream_ms = g.get('upstream_ms', 0) + seconds * 1000
+
+
+dojo.observer = _observe_upstream
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def add_fetch_headers(response):
+    started = g.get('request_started')
+    elapsed = time.perf_counter() - started if started else 0
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe('dashboard_request_seconds', elapsed, (('route', route),))
+    metrics.inc('dashboard_requests_total', (('route', route), ('status', str(response.status_code))))
+
+    if request.path.startswith('/api/'):
+        timings = list(g.get('server_timing', []))
+        if g.get('upstream_ms'):
+            timings.append(('upstream', g.upstream_ms))
+        timings.append(('total', elapsed * 1000))
+        response.headers['Server-Timing'] = ', '.join(f'{name};dur={ms:.1f}' for name, ms in timings)
+    if g.get('partial'):
+        # Lookup maps that could not be loaded; their names show as 'N/A'
+        response.headers['X-Partial-Results'] = ','.join(g.partial)
+    return response
+
+
+def _collect_runtime_metrics():
+    families = [
+        ('dashboard_requests_in_flight', 'gauge', [((), _active_requests)]),
+        ('dojo_upstream_requests_in_flight', 'gauge', [((), dojo.in_flight)]),
+        ('dashboard_event_streams', 'gauge', [((), change_feed.streams)])
+    ]
+
+    ref_samples, ref_ratios = [], []
+    for name, stats in ref_cache.stats().items():
+        for result in ('hits', 'stale_hits', 'misses'):
+            ref_samples.append(((('map', name), ('result', result)), stats[result]))
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        if lookups:
+            ref_ratios.append(((('map', name),), round((stats['hits'] + stats['stale_hits']) / lookups, 4)))
+    families.append(('dashboard_ref_cache_lookups_total', 'counter', ref_samples))
+    families.append(('dashboard_ref_cache_hit_ratio', 'gauge', ref_ratios))
+
+    stats = response_cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    families.append(('dashboard_response_cache_lookups_total', 'counter',
+                     [((('result', key),), stats[key]) for key in ('hits', 'misses', 'not_modified')]))
+    if lookups:
+        families.append(('dashboard_response_cache_hit_ratio', 'gauge', [((), round(stats['hits'] / lookups, 4))]))
+
+    now = time.time()
+    rows, ages = [], []
+    for store in (engagement_store, test_store):
+        status = store.status()
+        rows.append(((('store', store.name),), status['rows']))
+        if status['last_sync']:
+            ages.append(((('store', store.name),), round(now - status['last_sync'], 1)))
+    families.append(('dashboard_snapshot_rows', 'gauge', rows))
+    families.append(('dashboard_snapshot_age_seconds', 'gauge', ages))
+    return families
+
+
+metrics.collectors.append(_collect_runtime_metrics)
+
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# ---------------- Profiling ----------------
+# Opt-in: while enabled, sampled requests and requests slower than slow_ms
+# leave a cProfile dump and a text report (top functions plus tracemalloc
+# allocations) in a rotating directory. One request is profiled at a time.
+PROFILING_CONFIG = project_config.get('profiling', {}) or {}
+PROFILE_DIR = PROFILING_CONFIG.get('dir', 'profiles')
+PROFILE_KEEP = PROFILING_CONFIG.get('keep', 20)
+PROFILE_SAMPLE_RATE = PROFILING_CONFIG.get('sample_rate', 0.0)
+PROFILE_SLOW_MS = PROFILING_CONFIG.get('slow_ms', 1000)
+PROFILE_TRACEMALLOC = PROFILING_CONFIG.get('tracemalloc', True)
+PROFILE_TOP = 40
+
+profiling = {'enabled': bool(PROFILING_CONFIG.get('enabled', False)), 'reports': 0, 'latest': None}
+_profile_lock = threading.Lock()
+
+
+def set_profiling(enabled):
+    profiling['enabled'] = enabled
+    if PROFILE_TRACEMALLOC:
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+@app.before_request
+def _start_profile():
+    if not profiling['enabled'] or not request.path.startswith('/api/') \
+            or request.path.startswith(('/api/profiling', '/api/events')):
+        return
+    sampled = random.random() < PROFILE_SAMPLE_RATE
+    if not sampled and PROFILE_SLOW_MS <= 0:
+        return
+    # cProfile allows one active profiler; concurrent requests go unprofiled
+    if not _profile_lock.acquire(blocking=False):
+        return
+    g.profile_sampled = sampled
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        g.profile_memory = tracemalloc.take_snapshot() if sampled else None
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+
+@app.teardown_request
+def _finish_profile(exc=None):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000
+        if g.get('profile_sampled') or elapsed_ms >= PROFILE_SLOW_MS:
+            _write_profile(profiler, elapsed_ms, g.get('profile_memory'))
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+    finally:
+        _profile_lock.release()
+
+
+def _write_profile(profiler, elapsed_ms, before):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = (request.url_rule.rule if request.url_rule else request.path).strip('/').replace('/', '_')
+    route = ''.join(c for c in route if c.isalnum() or c in '_-')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    base = os.path.join(PROFILE_DIR, f'{stamp}_{route}_{elapsed_ms:.0f}ms')
+    profiler.dump_stats(base + '.prof')
+
+    out = io.StringIO()
+    out.write(f"{request.method} {request.full_path}\n")
+    out.write(f"elapsed: {elapsed_ms:.1f} ms ({'sampled' if g.get('profile_sampled') else 'slow'})\n")
+    out.write(f"server-timing: {', '.join(f'{n}={ms:.1f}ms' for n, ms in g.get('server_timing', []))}\n\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        out.write(f"\ntracemalloc: current {current / 1e6:.1f} MB, peak during request {peak / 1e6:.1f} MB\n")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ))
+        if before is not None:
+            out.write('top allocations during the request:\n')
+            top = snapshot.compare_to(before, 'lineno')[:PROFILE_TOP]
+        else:
+            out.write('top live allocations:\n')
+            top = snapshot.statistics('lineno')[:PROFILE_TOP]
+        for stat in top:
+            out.write(f"  {stat}\n")
+
+    with open(base + '.txt', 'w', encoding='utf-8') as f:
+        f.write(out.getvalue())
+    profiling['reports'] += 1
+    profiling['latest'] = base + '.txt'
+    _rotate_profiles()
+
+
+def _rotate_profiles():
+    reports = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith('.txt'))
+    for old in reports[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        for ext in ('.txt', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old[:-4] + ext))
+            except OSError:
+                pass
+
+
+def _latest_profile():
+    if not os.path.isdir(PROFILE_DIR):
+        return None
+    reports = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith('.txt'))
+    return os.path.join(PROFILE_DIR, reports[-1]) if reports else None
+
+
+@app.route('/api/profiling', methods=['GET', 'POST'])
+def profiling_settings():
+    """GET the profiling state; POST {"enabled": true|false} to toggle it (local callers only)."""
+    if request.method == 'POST':
+        denied = _launcher_only()
+        if denied:
+            return denied
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+        set_profiling(bool(data.get('enabled', not profiling['enabled'])))
+    return jsonify({
+        'success': True,
+        'enabled': profiling['enabled'],
+        'sample_rate': PROFILE_SAMPLE_RATE,
+        'slow_ms': PROFILE_SLOW_MS,
+        'dir': os.path.abspath(PROFILE_DIR),
+        'reports': profiling['reports'],
+        'latest': _latest_profile()
+    })
+
+
+@app.route('/api/profiling/latest')
+def latest_profile():
+    path = _latest_profile()
+    if path is None:
+        return jsonify({'success': False, 'error': 'No profile reports yet'}), 404
+    with open(path, 'r', encoding='utf-8') as f:
+        return Response(f.read(), mimetype='text/plain')
+
+
+set_profiling(profiling['enabled'])
+
+
+# ---------------- Row records ----------------
+# Upstream rows are parsed once, when they enter the snapshot, into slotted
+# records: only the fields the app reads, 'created' as a date ordinal and the
+# repeated labels interned. Table rows are built only for the returned page.
+_MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _tag_tuple(tags):
+    if not isinstance(tags, list):
+        return tags
+    return tuple(_intern(tag) for tag in tags)
+
+
+def _date_ordinal(value):
+    # Canonical 'YYYY-MM-DD...' values become ints; anything else is kept as is
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            day = date.fromisoformat(value[:10])
+        except ValueError:
+            return value
+        if day.isoformat() == value[:10]:
+            return day.toordinal()
+    return value
+
+
+class Record:
+    """
+    Compact stand-in for one upstream JSON row. Supports the dict methods the
+    app relies on (get, keys, [] and dict(record)); fields the upstream row
+    did not have read as missing, like they would from the dict.
+    """
+    __slots__ = ()
+    fields = ()
+    converters = {}
+
+    @classmethod
+    def from_row(cls, row):
+        if isinstance(row, cls):
+            return row
+        record = cls.__new__(cls)
+        for field in cls.fields:
+            value = row.get(field, _MISSING)
+            convert = cls.converters.get(field)
+            if convert is not None and value is not _MISSING:
+                value = convert(value)
+            setattr(record, field, value)
+        return record
+
+    @property
+    def created_day(self):
+        """Date ordinal of 'created', or None when it is missing or not a date."""
+        value = self.created
+        return value if type(value) is int else None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, _MISSING) if key in self.fields else _MISSING
+        if value is _MISSING:
+            return default
+        if key == 'created' and type(value) is int:
+            return date.fromordinal(value).isoformat()
+        return value
+
+    def keys(self):
+        return [field for field in self.fields if getattr(self, field) is not _MISSING]
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
+
+
+class EngagementRecord(Record):
+    fields = ('id', 'name', 'created', 'updated', 'status', 'lead', 'product',
+              'target_start', 'target_end', 'build_id', 'commit_hash', 'version', 'description')
+    __slots__ = fields
+    converters = {
+        'created': _date_ordinal,
+        'status': _intern,
+        'target_start': _intern,
+        'target_end': _intern,
+        'build_id': _intern,
+        'commit_hash': _intern,
+        'version': _intern
+    }
+
+
+class TestRecord(Record):
+    fields = ('id', 'title', 'created', 'updated', 'tags', 'build_id', 'branch_tag', 'commit_hash',
+              'lead', 'environment', 'engagement', 'target_start', 'target_end',
+              'test_type', 'test_type_name')
+    __slots__ = fields
+    converters = {
+        'created': _date_ordinal,
+        'tags': _tag_tuple,
+        'build_id': _intern,
+        'branch_tag': _intern,
+        'commit_hash': _intern,
+        'target_start': _intern,
+        'target_end': _intern,
+        'test_type_name': _intern
+    }
+
+
+# ---------------- Snapshot store ----------------
+# Engagements and tests are kept in a local in-memory store that a background
+# thread keeps in sync with DefectDojo. Endpoints read from the store instead
+# of downloading the whole collection on every request.
+SYNC_INTERVAL = project_config.get('sync_interval', 30)
+FULL_SYNC_INTERVAL = project_config.get('full_sync_interval', 600)
+
+# Above this many changed rows, derived values are rebuilt rather than patched
+MAX_PATCHED_ROWS = 50
+
+
+class SnapshotStore:
+    """
+    Local copy of one DefectDojo collection keyed by id.
+    - full sync replaces the whole snapshot (also picks up deletions)
+    - incremental sync asks for rows ordered by -updated and stops at the
+      newest 'updated' value already held (the watermark)
+    """
+
+    def __init__(self, name, path, record=None, scope=()):
+        self.name = name
+        self.path = path
+        # Converts an upstream JSON row into the form kept in the snapshot
+        self.record = record or (lambda row: row)
+        # Predicates every kept row satisfies, pushed down to DefectDojo where possible
+        self.scope = list(scope)
+        self.params, residual = plan_query(path, self.scope)
+        self._post_filter = residual_filter(residual)
+        self.pushdown = None
+        self.version = 0
+        self.watermark = ''
+        self.last_sync = None
+        self.last_full_sync = None
+        self.last_error = None
+        self.warm_started = None  # saved_at of the on-disk snapshot we started from
+        self._rows = {}
+        self._rows_list = []
+        self._derived = {}  # name -> (version, value)
+        # name -> fn(value, old_row, new_row) returning the patched value,
+        # or None when the derived value has to be rebuilt
+        self.patchers = {}
+        # fn(store, pairs, deleted) called after a sync or write changes rows;
+        # pairs are (old_row, new_row) with old_row None for new rows
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._derived_lock = threading.RLock()  # builders may read other derived values
+
+    @property
+    def loaded(self):
+        return self.last_full_sync is not None
+
+    def rows(self):
+        """Return the current snapshot as a list, loading it on first use."""
+        if not self.loaded:
+            with self._sync_lock:
+                if not self.loaded and not self._warm_start():
+                    self._full_sync()
+        sync_engine.start()
+        return self._rows_list
+
+    def _warm_start(self):
+        """Start from the snapshot saved by a previous run, then catch up in the background."""
+        saved = warm_start.load(self.name)
+        if saved is None:
+            return False
+        rows, watermark, saved_at = saved
+        with self._lock:
+            self._publish({row.get('id'): row for row in map(self.record, rows)}, watermark)
+            self.last_sync = self.last_full_sync = self.warm_started = saved_at
+        threading.Thread(target=self._reconcile, name=f'dojo-reconcile-{self.name}', daemon=True).start()
+        return True
+
+    def _reconcile(self):
+        # Full, so rows deleted while we were down disappear too
+        try:
+            self.sync(full=True)
+        except Exception as e:
+            print(f"Error reconciling {self.name} after warm start: {e}")
+
+    def persisted(self):
+        """Return (version, rows, watermark, last_sync) as one consistent set, for saving."""
+        with self._lock:
+            return self.version, self._rows_list, self.watermark, self.last_sync
+
+    def snapshot(self):
+        """Return (version, rows) as one consistent pair."""
+        self.rows()
+        with self._lock:
+            return self.version, self._rows_list
+
+    def derived(self, name, build):
+        """
+        Return build(rows) for the current snapshot version, building it at
+        most once per version (indexes, aggregates, ...).
+        """
+        version, rows = self.snapshot()
+        cached = self._derived.get(name)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._derived_lock:
+            cached = self._derived.get(name)
+            if cached and cached[0] == version:
+                return cached[1]
+            value = build(rows)
+            self._derived[name] = (version, value)
+            return value
+
+    def _publish(self, rows, watermark=None):
+        # Caller holds self._lock
+        self._rows = rows
+        self._rows_list = list(rows.values())
+        if watermark is None:
+            watermark = max((r.get('updated') or '' for r in self._rows_list), default='')
+        self.watermark = watermark
+        self.version += 1
+
+    def _apply(self, changed, watermark=None, removed=()):
+        """
+        Publish a new version with `changed` rows upserted and the `removed`
+        ids dropped, then patch the derived values in place of rebuilding
+        them where a patcher allows (removals always rebuild).
+        """
+        # Last copy wins when a row shows up twice (offset pages can repeat
+        # rows that moved while paging); patchers need one (old, new) per id
+        changed = list({row.get('id'): row for row in changed}.values())
+        with self._lock:
+            pairs = [(self._rows.get(row.get('id')), row) for row in changed]
+            pairs = [(old, new) for old, new in pairs if old != new]
+            deleted = [self._rows[key] for key in set(removed) if key in self._rows]
+            if not pairs and not deleted:
+                if watermark is not None:
+                    self.watermark = max(self.watermark, watermark)
+                return False
+            previous = self.version
+            rows = dict(self._rows)
+            for _, row in pairs:
+                rows[row.get('id')] = row
+            for row in deleted:
+                del rows[row.get('id')]
+            self._publish(rows, watermark)
+            version = self.version
+
+        with self._derived_lock:
+            for name, (built_at, value) in list(self._derived.items()):
+                patcher = self.patchers.get(name)
+                if built_at == previous and patcher and not deleted and len(pairs) <= MAX_PATCHED_ROWS:
+                    for old, new in pairs:
+                        value = patcher(value, old, new) if old is not None and value is not None else None
+                    if value is not None:
+                        self._derived[name] = (version, value)
+                        continue
+                del self._derived[name]
+        self._notify(pairs, deleted)
+        return True
+
+    def _notify(self, pairs, deleted):
+        for listener in self.listeners:
+            try:
+                listener(self, pairs, deleted)
+            except Exception as e:
+                print(f"Error publishing {self.name} changes: {e}")
+
+    def upsert(self, row):
+        """
+        Write-through from a PUT response: patch the local row without a
+        round trip upstream. The watermark is left alone so the next sync
+        still picks up anything else that changed in the meantime.
+        """
+        if not self.loaded or row.get('id') is None:
+            return False
+        if self.in_scope(row):
+            self._apply([self.record(row)], watermark=self.watermark)
+        else:
+            # e.g. a test whose mcr_jira tag was just removed
+            self._apply([], watermark=self.watermark, removed=[row.get('id')])
+        return True
+
+    def in_scope(self, row):
+        # For rows that were not filtered upstream (PUT replies, incremental sync)
+        return all(_matches(row, predicate) for predicate in self.scope)
+
+    def _download(self, params=None, concurrency=None, counter=None):
+        # Rows matching the scope: pushed-down params upstream, the rest checked here
+        query = dict(self.params, **(params or {}))
+        for row in iter_collection(self.path, query, concurrency=concurrency):
+            if counter is not None:
+                counter[0] += 1
+            if self._post_filter is None or self._post_filter(row):
+                yield row
+
+    def _full_sync(self):
+        downloaded = [0]
+        rows = {row.get('id'): self.record(row) for row in self._download(counter=downloaded)}
+        if self.params:
+            self._log_pushdown(downloaded[0], len(rows))
+        with self._lock:
+            previous = self._rows if self.loaded else None
+            self._publish(rows)
+            self.last_sync = self.last_full_sync = time.time()
+            self.last_error = None
+
+        if previous is not None:
+            # Diff against the old snapshot; this is the only place deletions show up
+            pairs = [(previous.get(key), row) for key, row in rows.items() if previous.get(key) != row]
+            deleted = [row for key, row in previous.items() if key not in rows]
+            if pairs or deleted:
+                self._notify(pairs, deleted)
+
+    def _incremental_sync(self):
+        # Newest first, one page at a time, until we reach rows we already hold.
+        # The scope is not pushed down here: a row that just left the scope
+        # (e.g. lost its mcr_jira tag) has to be seen so it can be dropped.
+        changed, removed = [], []
+        newest = previous = None
+        for row in iter_collection(self.path, {'o': '-updated'}, concurrency=1):
+            updated = row.get('updated') or ''
+            if previous is not None and updated > previous:
+                # Upstream ignored the ordering
+                self._full_sync()
+                return
+            previous = updated
+            if updated < self.watermark:
+                break
+            newest = newest or updated
+            if self.in_scope(row):
+                changed.append(self.record(row))
+            else:
+                removed.append(row.get('id'))
+
+        # Out-of-scope rows move the watermark too, so they are not fetched again
+        watermark = max(self.watermark, newest) if newest else None
+        self._apply(changed, watermark=watermark, removed=removed)
+        with self._lock:
+            self.last_sync = time.time()
+            self.last_error = None
+
+    def _log_pushdown(self, downloaded, kept):
+        try:
+            total = upstream_count(self.path)
+        except Exception as e:
+            print(f"Error counting {self.name} upstream: {e}")
+            return
+        pushed = 1 - downloaded / total if total else 0.0
+        self.pushdown = {
+            'params': self.params,
+            'upstream_rows': total,
+            'downloaded': downloaded,
+            'kept': kept,
+            'pushed_fraction': round(pushed, 4)
+        }
+        print(f"{self.name}: downloaded {downloaded} of {total} rows with {self.params} "
+              f"({pushed:.0%} filtered by DefectDojo, {downloaded - kept} dropped locally)")
+
+    def sync(self, full=False):
+        with self._sync_lock:
+            try:
+                if full or not self.loaded:
+                    self._full_sync()
+                else:
+                    self._incremental_sync()
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+
+    def status(self):
+        return {
+            'rows': len(self._rows_list),
+            'version': self.version,
+            'watermark': self.watermark,
+            'last_sync': self.last_sync,
+            'last_full_sync': self.last_full_sync,
+            'last_error': self.last_error,
+            'warm_started': self.warm_started,
+            'pushdown': self.pushdown
+        }
+
+
+class SyncEngine:
+    """Background thread that keeps the snapshot stores up to date."""
+
+    def __init__(self, stores, interval, full_interval):
+        self.stores = stores
+        self.interval = interval
+        self.full_interval = full_interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Callables run after every sync round
+        self.after_sync = []
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='dojo-sync', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for store in self.stores:
+                full = store.last_full_sync is None or \
+                    time.time() - store.last_full_sync >= self.full_interval
+                try:
+                    store.sync(full=full)
+                except Exception as e:
+                    print(f"Error syncing {store.name}: {e}")
+            for hook in self.after_sync:
+                try:
+                    hook()
+                except Exception as e:
+                    print(f"Error after sync: {e}")
 
-def get_engagements_map():
+
+def _resync_after_write(store):
+    # Pull the row we just changed so the next table load sees it
     try:
-        response = requests.get(f'{API_BASE_URL}/api/v2/engagements/?limit=1000', headers=HEADERS, timeout=30)
-        engagements = response.json().get('results', []) or []
-        return {e.get('id'): e.get('name', 'N/A') for e in engagements if e}
-    except:
-        return {}
+        store.sync()
+    except Exception as e:
+        print(f"Error syncing {store.name} after update: {e}")
+
 
-def get_environments_map():
+def _write_through(store, response):
+    # Patch the snapshot from DefectDojo's reply; re-read only if it has no row
     try:
-        response = requests.get(f'{API_BASE_URL}/api/v2/development_environments/?limit=1000', headers=HEADERS, timeout=30)
-        environments = response.json().get('results', []) or []
-        return {e.get('id'): e.get('name', 'N/A') for e in environments if e}
-    except:
-        return {}
+        row = response.json()
+    except ValueError:
+        row = None
+    if not isinstance(row, dict) or not store.upsert(row):
+        _resync_after_write(store)
+
+
+engagement_store = SnapshotStore('engagements', '/api/v2/engagements/', EngagementRecord.from_row)
+# Every consumer of the tests snapshot only looks at mcr_jira tests
+test_store = SnapshotStore('tests', '/api/v2/tests/', TestRecord.from_row,
+                           scope=[('contains', 'tags', 'mcr_jira')])
+sync_engine = SyncEngine([engagement_store, test_store], SYNC_INTERVAL, FULL_SYNC_INTERVAL)
+
+
+# ---------------- Secondary indexes ----------------
+# Built once per snapshot version so filtered pages are produced by
+# intersecting candidate sets instead of scanning every row per request.
+TEXT_GRAM = 3
+
+# Optional: date range filters become one vectorized mask per query
+try:
+    import numpy
+except Exception:
+    numpy = None
+
+
+class RowIndex:
+    """
+    Indexes over the rows of one snapshot version that pass `keep`.
+    - hash indexes for equality filters: field -> value -> set of positions
+    - sorted (value, position) arrays for date ranges, searched with bisect
+    - a trigram index for case-insensitive substring search
+    - per-field sort orders for server-side sorting and keyset pages
+    Positions refer to self.rows, which keeps the upstream order.
+    """
+
+    def __init__(self, rows, keep, equal_fields, date_fields, text_field, sort_fields=None):
+        self.keep = keep
+        self.equal_fields = equal_fields
+        self.date_fields = date_fields
+        self.text_field = text_field
+        self.rows = [row for row in rows if keep(row)]
+        self.all = set(range(len(self.rows)))
+        self.positions = {row.get('id'): pos for pos, row in enumerate(self.rows)}
+        self.sort_fields = dict(sort_fields or {})
+        self.sort_fields['id'] = lambda row: 0
+        self._orders = {}
+        self._order_lock = threading.Lock()
+
+        self.equal = {}
+        for field, key in equal_fields.items():
+            index = self.equal[field] = {}
+            for pos, row in enumerate(self.rows):
+                index.setdefault(key(row), set()).add(pos)
+
+        # Rows without a date always pass a date range (matches the table's 'N/A')
+        self.dates = {}
+        for field, key in date_fields.items():
+            values = []
+            undated = set()
+            for pos, row in enumerate(self.rows):
+                value = key(row)
+                if value:
+                    values.append((value, pos))
+                else:
+                    undated.add(pos)
+            values.sort()
+            self.dates[field] = ([v for v, _ in values], [p for _, p in values], undated)
+
+        # Date ordinals per position (0 = no date), None if a value is not a plain date
+        self.date_columns = {}
+        if numpy is not None:
+            for field, (values, positions, _) in self.dates.items():
+                self.date_columns[field] = _ordinal_column(values, positions, len(self.rows))
+
+        self.text = [text_field(row) for row in self.rows]
+        self.grams = {}
+        for pos, text in enumerate(self.text):
+            for gram in _grams(text):
+                self.grams.setdefault(gram, set()).add(pos)
+
+    def patched(self, old, new):
+        """
+        Return a copy with one row replaced, copying only the structures
+        whose keys changed. Returns None when the row enters or leaves the
+        index, in which case the caller rebuilds it.
+        """
+        pos = self.positions.get(new.get('id'))
+        if pos is None:
+            return None if self.keep(new) else self
+        if not self.keep(new):
+            return None
+
+        clone = copy.copy(self)
+        clone.rows = list(self.rows)
+        clone.rows[pos] = new
+
+        clone.equal = dict(self.equal)
+        for field, key in self.equal_fields.items():
+            before, after = key(old), key(new)
+            if before != after:
+                index = clone.equal[field] = dict(self.equal[field])
+                index[before] = index[before] - {pos}
+                if not index[before]:
+                    del index[before]
+                index[after] = index.get(after, set()) | {pos}
+
+        clone.dates = dict(self.dates)
+        for field, key in self.date_fields.items():
+            before, after = key(old), key(new)
+            if before != after:
+                values, positions, undated = self.dates[field]
+                values, positions, undated = list(values), list(positions), set(undated)
+                if before:
+                    i = bisect_left(values, before)
+                    while positions[i] != pos:
+                        i += 1
+                    del values[i]
+                    del positions[i]
+                else:
+                    undated.discard(pos)
+                if after:
+                    i = bisect_right(values, after)
+                    values.insert(i, after)
+                    positions.insert(i, pos)
+                else:
+                    undated.add(pos)
+                clone.dates[field] = (values, positions, undated)
+
+                column = self.date_columns.get(field)
+                if column is not None:
+                    day = _date_ordinal(after) if after else 0
+                    column = column.copy() if type(day) is int else None
+                    if column is not None:
+                        column[pos] = day
+                    clone.date_columns = dict(clone.date_columns)
+                    clone.date_columns[field] = column
+
+        before, after = self.text[pos], self.text_field(new)
+        if before != after:
+            clone.text = list(self.text)
+            clone.text[pos] = after
+            clone.grams = dict(self.grams)
+            old_grams, new_grams = _grams(before), _grams(after)
+            for gram in old_grams - new_grams:
+                clone.grams[gram] = clone.grams[gram] - {pos}
+                if not clone.grams[gram]:
+                    del clone.grams[gram]
+            for gram in new_grams - old_grams:
+                clone.grams[gram] = clone.grams.get(gram, set()) | {pos}
+
+        # Sort orders survive unless this row's sort key moved
+        clone._orders = {field: ordered for field, ordered in self._orders.items()
+                         if self.sort_fields[field](old) == self.sort_fields[field](new)}
+        clone._order_lock = threading.Lock()
+        return clone
+
+    def _date_range(self, field, start, end):
+        values, positions, undated = self.dates[field]
+        lo = bisect_left(values, start) if start else 0
+        hi = bisect_right(values, end) if end else len(values)
+        return undated.union(positions[lo:hi])
+
+    def _range_mask(self, ranges):
+        """
+        Positions passing every date range in one vectorized pass, or None
+        when numpy is missing or a column or bound is not a plain date.
+        """
+        if numpy is None:
+            return None
+        mask = None
+        for field, (start, end) in ranges.items():
+            column = self.date_columns.get(field)
+            lo = _bound_ordinal(start) if start else 1
+            hi = _bound_ordinal(end) if end else date.max.toordinal()
+            if column is None or lo is None or hi is None:
+                return None
+            passed = (column == 0) | ((column >= lo) & (column <= hi))
+            mask = passed if mask is None else mask & passed
+        return set(numpy.flatnonzero(mask).tolist())
+
+    def _contains(self, query):
+        sets = [self.grams.get(gram, set()) for gram in _grams(query)]
+        return set.intersection(*sets) if sets else None
+
+    def select(self, equal=None, ranges=None, text=''):
+        """Return the sorted positions matching every non-empty filter."""
+        candidates = []
+        for field, value in (equal or {}).items():
+            if value:
+                candidates.append(self.equal[field].get(value, set()))
+        ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds[0] or bounds[1]}
+        masked = self._range_mask(ranges) if ranges else None
+        if masked is not None:
+            candidates.append(masked)
+        else:
+            for field, (start, end) in ranges.items():
+                candidates.append(self._date_range(field, start, end))
+        if text:
+            grams = self._contains(text)
+            if grams is not None:
+                candidates.append(grams)
+
+        if candidates:
+            candidates.sort(key=len)
+            result = set(candidates[0])
+            for other in candidates[1:]:
+                result &= other
+        else:
+            result = self.all
+
+        if text:
+            # Trigrams narrow the candidates; the substring check is exact
+            result = {pos for pos in result if text in self.text[pos]}
+        return result
+
+    def order(self, field):
+        """
+        Return (keys, positions, ranks) for `field`: keys are the ascending
+        (value, id) pairs, positions the rows in that order and ranks the
+        inverse mapping position -> index. Built on first use.
+        """
+        ordered = self._orders.get(field)
+        if ordered is None:
+            with self._order_lock:
+                ordered = self._orders.get(field)
+                if ordered is None:
+                    key = self.sort_fields[field]
+                    pairs = sorted(((key(row), row.get('id') or 0), pos) for pos, row in enumerate(self.rows))
+                    positions = [pos for _, pos in pairs]
+                    ranks = [0] * len(positions)
+                    for rank, pos in enumerate(positions):
+                        ranks[pos] = rank
+                    ordered = self._orders[field] = ([k for k, _ in pairs], positions, ranks)
+        return ordered
+
+    def key_type(self, field):
+        """Type of the sort values of `field`, or None when there are no rows."""
+        keys = self.order(field)[0]
+        return type(keys[0][0]) if keys else None
+
+    def page(self, result, sort='', descending=False, offset=0, limit=10, after=None):
+        """
+        Return (positions, last_key, has_more) for one page of `result`.
+        Without a sort the upstream order is kept and `offset` is used.
+        With a sort, `after` is the (value, id) key of the last row already
+        returned, so a page costs O(limit) when most rows match.
+        """
+        if not sort:
+            ordered = range(len(self.rows)) if result is self.all else sorted(result)
+            return list(ordered[offset:offset + limit]), None, offset + limit < len(result)
+
+        if offset < 0:
+            return [], None, False
+        keys, positions, ranks = self.order(sort)
+        if after is None:
+            first = len(keys) - 1 if descending else 0
+        elif descending:
+            first = bisect_left(keys, after) - 1
+        else:
+            first = bisect_right(keys, after)
+
+        if result is self.all or len(result) * 16 >= len(self.rows):
+            # Walk the sort order from the cursor, keeping matching rows
+            step = -1 if descending else 1
+            stop = -1 if descending else len(keys)
+            if result is self.all:
+                start = first + step * offset
+                picked = list(range(start, stop, step)[:limit + 1])
+            else:
+                picked = []
+                skip = offset
+                for rank in range(first, stop, step):
+                    if positions[rank] in result:
+                        if skip:
+                            skip -= 1
+                            continue
+                        picked.append(rank)
+                        if len(picked) > limit:
+                            break
+        else:
+            # Few matches: sort them by rank instead of walking every row
+            matched = sorted(ranks[pos] for pos in result)
+            if descending:
+                matched = matched[:bisect_right(matched, first)][::-1]
+            else:
+                matched = matched[bisect_left(matched, first):]
+            picked = matched[offset:offset + limit + 1]
+
+        has_more = len(picked) > limit
+        picked = picked[:limit]
+        last_key = keys[picked[-1]] if picked else None
+        return [positions[rank] for rank in picked], last_key, has_more
+
+
+def _ordinal_column(values, positions, size):
+    ordinals = [_date_ordinal(value) for value in values]
+    if any(type(day) is not int for day in ordinals):
+        return None
+    column = numpy.zeros(size, dtype=numpy.int32)
+    column[numpy.array(positions, dtype=numpy.int64)] = ordinals
+    return column
+
+
+def _bound_ordinal(value):
+    # Only exact YYYY-MM-DD bounds compare the same as the string filters
+    day = _date_ordinal(value) if len(value) == 10 else value
+    return day if type(day) is int else None
+
+
+def _grams(text):
+    return {text[i:i + TEXT_GRAM] for i in range(len(text) - TEXT_GRAM + 1)}
+
+
+def _has_mcr_jira(test):
+    tags = test.get('tags', []) or []
+    return any(tag for tag in tags if tag and 'mcr_jira' in str(tag).lower())
+
+
+def _build_engagement_index(rows):
+    return RowIndex(
+        rows,
+        keep=lambda eng: eng.get('status') in ALLOWED_STATUSES,
+        equal_fields={
+            'status': lambda eng: eng.get('status', 'N/A'),
+            'lead': lambda eng: str(eng.get('lead')),
+            'build_id': lambda eng: eng.get('build_id') or 'N/A',
+            'commit_hash': lambda eng: eng.get('commit_hash') or 'N/A',
+            'product': lambda eng: str(eng.get('product'))
+        },
+        date_fields={
+            'created': lambda eng: (eng.get('created') or '')[:10],
+            'target_start': lambda eng: eng.get('target_start') or '',
+            'target_end': lambda eng: eng.get('target_end') or ''
+        },
+        text_field=lambda eng: str(eng.get('name', 'N/A') or '').lower(),
+        sort_fields={
+            'aging': _row_aging,
+            'created': lambda eng: (eng.get('created') or '')[:10],
+            'updated': lambda eng: eng.get('updated') or '',
+            'target_start': lambda eng: eng.get('target_start') or '',
+            'target_end': lambda eng: eng.get('target_end') or '',
+            'name': lambda eng: str(eng.get('name', 'N/A') or '').lower()
+        }
+    )
+
+
+def _build_test_index(rows):
+    return RowIndex(
+        rows,
+        keep=lambda test: _has_mcr_jira(test) and (test.get('build_id') or '').strip() in ['Pending', 'On Hold'],
+        equal_fields={
+            'branch_tag': lambda test: test.get('branch_tag', ''),
+            'commit_hash': lambda test: test.get('commit_hash', ''),
+            'build_id': lambda test: (test.get('build_id') or '').strip(),
+            'lead': lambda test: str(test.get('lead')),
+            'environment': lambda test: str(test.get('environment')),
+            'engagement': lambda test: str(test.get('engagement'))
+        },
+        date_fields={},
+        text_field=lambda test: str(test.get('title', '') or '').lower(),
+        sort_fields={
+            'created': lambda test: (test.get('created') or '')[:10],
+            'updated': lambda test: test.get('updated') or '',
+            'target_start': lambda test: test.get('target_start') or '',
+            'target_end': lambda test: test.get('target_end') or '',
+            'title': lambda test: str(test.get('title', '') or '').lower()
+        }
+    )
+
+
+def encode_cursor(sort, order, key):
+    raw = json.dumps([sort, order, key[0], key[1]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, order, value_type=None):
+    """
+    Return the (value, id) key stored in `cursor`, or raise ValueError.
+    The key is compared against the sort order's keys, so its value must have
+    the sort field's type (`value_type`) and its id must be an int.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(decoded, list) or len(decoded) != 4:
+        raise ValueError('Invalid cursor')
+    cursor_sort, cursor_order, value, row_id = decoded
+    if cursor_sort != sort or cursor_order != order:
+        raise ValueError('Cursor does not match the requested sort')
+    if type(row_id) is not int or (value_type is not None and type(value) is not value_type):
+        raise ValueError('Invalid cursor')
+    return value, row_id
+
+
+def paginate(index, result, args, default_limit=10):
+    """
+    Shared paging for the table endpoints.
+    page/limit keep working as before; with ?sort=<field>&order=asc|desc the
+    rows are sorted server-side and the response carries an opaque
+    next_cursor that can be passed back as ?cursor= to get the next page.
+    """
+    page = args.get('page', 1, type=int)
+    limit = args.get('limit', default_limit, type=int)
+    sort = args.get('sort', '').strip()
+    order = args.get('order', 'asc').strip().lower()
+    cursor = args.get('cursor', '').strip()
+
+    if limit is None or limit < 1:
+        raise ValueError('limit must be at least 1')
+    if page is None or page < 1:
+        raise ValueError('page must be at least 1')
+    if sort and sort not in index.sort_fields:
+        raise ValueError(f'Unsupported sort field: {sort}')
+    if order not in ('asc', 'desc'):
+        raise ValueError(f'Unsupported sort order: {order}')
+    if cursor and not sort:
+        sort = 'id'
+
+    after = decode_cursor(cursor, sort, order, index.key_type(sort)) if cursor else None
+    offset = 0 if cursor else (page - 1) * limit
+    positions, last_key, has_more = index.page(result, sort, order == 'desc', offset, limit, after)
+
+    meta = {'total': len(result), 'page': page, 'limit': limit}
+    if sort:
+        meta['sort'] = sort
+        meta['order'] = order
+        meta['next_cursor'] = encode_cursor(sort, order, last_key) if has_more and last_key is not None else None
+    return positions, meta
+
+
+def engagement_index():
+    return engagement_store.derived('index', _build_engagement_index)
+
+
+def test_index():
+    return test_store.derived('index', _build_test_index)
+
+
+# ---------------- Aggregates ----------------
+# One pass per snapshot version collects everything the filter-option and
+# summary endpoints need; names are resolved from the lookup maps per request.
+def _build_engagement_aggregates(rows):
+    agg = {
+        'lead_ids': set(),
+        'build_ids': set(),
+        'commit_hashes': set(),
+        'product_ids': set(),
+        'lead_status': {}  # lead_id -> status -> count
+    }
+    for eng in engagement_index().rows:
+        lead_id = eng.get('lead')
+        if lead_id:
+            agg['lead_ids'].add(lead_id)
+            counts = agg['lead_status'].setdefault(lead_id, {status: 0 for status in ALLOWED_STATUSES})
+            counts[eng.get('status')] += 1
+
+        build_id = eng.get('build_id')
+        if build_id and build_id != 'N/A':
+            agg['build_ids'].add(build_id)
+
+        commit_hash = eng.get('commit_hash')
+        if commit_hash and commit_hash != 'N/A':
+            agg['commit_hashes'].add(commit_hash)
+
+        product_id = eng.get('product')
+        if product_id:
+            agg['product_ids'].add(product_id)
+    return agg
+
+
+def _build_test_aggregates(rows):
+    agg = {
+        'branch_tags': set(),
+        'commit_hashes': set(),
+        'build_ids': set(),
+        'lead_ids': set(),
+        'environment_ids': set(),
+        'engagement_ids': set(),
+        'lead_env_build': {}  # (lead_id, env_id) -> build_id -> count
+    }
+    # The test index already holds only mcr_jira tests that are Pending/On Hold
+    for test in test_index().rows:
+        branch_tag = (test.get('branch_tag') or '').strip()
+        if branch_tag:
+            agg['branch_tags'].add(branch_tag)
+
+        commit_hash = (test.get('commit_hash') or '').strip()
+        if commit_hash:
+            agg['commit_hashes'].add(commit_hash)
+
+        build_id = (test.get('build_id') or '').strip()
+        agg['build_ids'].add(build_id)
+
+        lead_id = test.get('lead')
+        env_id = test.get('environment')
+        eng_id = test.get('engagement')
+        if lead_id:
+            agg['lead_ids'].add(lead_id)
+        if env_id:
+            agg['environment_ids'].add(env_id)
+        if eng_id:
+            agg['engagement_ids'].add(eng_id)
+
+        if lead_id and env_id:
+            counts = agg['lead_env_build'].setdefault((lead_id, env_id), {'Pending': 0, 'On Hold': 0})
+            counts[build_id] += 1
+    return agg
+
+
+def engagement_aggregates():
+    return engagement_store.derived('aggregates', _build_engagement_aggregates)
+
+
+def test_aggregates():
+    return test_store.derived('aggregates', _build_test_aggregates)
+
+
+def _keep_unless_changed(*fields):
+    # Patcher for aggregates: still valid if none of `fields` changed
+    def patch(agg, old, new):
+        return agg if all(old.get(f) == new.get(f) for f in fields) else None
+    return patch
+
+
+# Write-through edits patch the indexes and keep aggregates they cannot affect
+engagement_store.patchers['index'] = RowIndex.patched
+engagement_store.patchers['aggregates'] = _keep_unless_changed(
+    'status', 'lead', 'build_id', 'commit_hash', 'product')
+test_store.patchers['index'] = RowIndex.patched
+test_store.patchers['aggregates'] = _keep_unless_changed(
+    'tags', 'build_id', 'branch_tag', 'commit_hash', 'lead', 'environment', 'engagement')
+
+
+# ---------------- Change feed ----------------
+# The sync poller publishes what changed between snapshot versions, so open
+# dashboards follow /api/events instead of each re-polling the tables.
+EVENTS_CONFIG = project_config.get('events', {}) or {}
+EVENT_BACKLOG = EVENTS_CONFIG.get('backlog', 1000)
+EVENT_HEARTBEAT = EVENTS_CONFIG.get('heartbeat', 15)
+# Streams are closed after this long; EventSource reconnects with Last-Event-ID
+EVENT_STREAM_SECONDS = EVENTS_CONFIG.get('stream_seconds', 300)
+EVENT_MAX_STREAMS = EVENTS_CONFIG.get('max_streams', 4)
+EVENT_LONG_POLL_MAX = 60
+
+# Above this many changed rows a batch is sent as one 'reload' event
+EVENT_MAX_ROWS = 200
+
+
+class ChangeFeed:
+    """
+    Numbered, bounded backlog of change events. Readers block until
+    something newer than the last sequence number they saw is published.
+    """
+
+    def __init__(self, backlog):
+        self.seq = 0
+        self.streams = 0
+        self._events = deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def publish(self, event_type, data):
+        with self._cond:
+            self.seq += 1
+            self._events.append((self.seq, event_type, data))
+            self._cond.notify_all()
+
+    def wait(self, since, timeout):
+        """
+        Return (events, closed) once there are events after `since`, the feed
+        is closed or `timeout` passes. `since` values the backlog no longer
+        covers (or from before a restart) get a single 'reload' event.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self.seq != since, timeout)
+            if self.seq == since:
+                return [], self._closed
+            if since > self.seq or not self._events or since < self._events[0][0] - 1:
+                return [(self.seq, 'reload', {'reason': 'missed events'})], self._closed
+            return [event for event in self._events if event[0] > since], self._closed
+
+    def open_stream(self):
+        with self._cond:
+            if self.streams >= EVENT_MAX_STREAMS:
+                return False
+            self.streams += 1
+            return True
+
+    def close_stream(self):
+        with self._cond:
+            self.streams -= 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+change_feed = ChangeFeed(EVENT_BACKLOG)
+
+
+def _event_rows(store, rows):
+    # Rows formatted the way the tables show them, so clients can patch in place
+    users_map = get_users_map()
+    if store is engagement_store:
+        products_map = get_products_map()
+        return [_engagement_row(row, users_map, products_map) for row in rows]
+    engagements_map = get_engagements_map()
+    environments_map = get_environments_map()
+    return [_test_row(row, users_map, engagements_map, environments_map) for row in rows]
+
+
+def _publish_changes(store, pairs, deleted):
+    # Events describe the table, not the snapshot: totals and membership
+    # follow the index (engagement status, Pending/On Hold tests)
+    index = engagement_index() if store is engagement_store else test_index()
+    total = len(index.rows)
+    base = {'collection': store.name, 'version': store.version, 'total': total}
+
+    if len(pairs) + len(deleted) > EVENT_MAX_ROWS:
+        change_feed.publish('reload', dict(base, reason='large change'))
+        return
+
+    shown = [new for _, new in pairs if index.keep(new)]
+    removed = [new for old, new in pairs if old is not None and index.keep(old) and not index.keep(new)]
+    removed += [row for row in deleted if index.keep(row)]
+    if shown:
+        change_feed.publish('upsert', dict(base, rows=_event_rows(store, shown)))
+    if removed:
+        change_feed.publish('delete', dict(base, ids=[row.get('id') for row in removed]))
+
+    counts = {}
+    if removed or any(old is None or not index.keep(old) for old, new in pairs if index.keep(new)):
+        counts['total'] = total
+    if store is test_store:
+        # Jira counts of every engagement a changed test belongs (or belonged) to
+        engagement_ids = set()
+        for old, new in pairs:
+            if old is not None:
+                engagement_ids.add(old.get('engagement'))
+            engagement_ids.add(new.get('engagement'))
+        engagement_ids.update(row.get('engagement') for row in deleted)
+        engagement_ids.discard(None)
+        if engagement_ids:
+            counts['jira_counts'] = _batched_jira_counts(sorted(engagement_ids, key=str))
+    if counts:
+        change_feed.publish('counts', dict(base, **counts))
+
+
+engagement_store.listeners.append(_publish_changes)
+test_store.listeners.append(_publish_changes)
+
+
+def _format_event(seq, event_type, data):
+    return f'id: {seq}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+@app.route('/api/events')
+def stream_events():
+    """
+    Change events as Server-Sent Events (Accept: text/event-stream), or as a
+    JSON long-poll: GET /api/events?since=<seq>&wait=<seconds>.
+    """
+    try:
+        # Loads the snapshots on first use, which also starts the sync poller
+        engagement_store.rows()
+        test_store.rows()
+
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        since = int(since) if since not in (None, '') else change_feed.seq
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid event id'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    if 'text/event-stream' not in request.headers.get('Accept', ''):
+        try:
+            wait = min(float(request.args.get('wait', 25)), EVENT_LONG_POLL_MAX)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid wait'}), 400
+        events, _ = change_feed.wait(since, wait)
+        return jsonify({
+            'success': True,
+            'seq': events[-1][0] if events else since,
+            'events': [{'id': seq, 'event': event_type, 'data': data} for seq, event_type, data in events]
+        })
+
+    if not change_feed.open_stream():
+        # Each stream holds a server thread; extra tabs fall back to long-polling
+        return jsonify({'success': False, 'error': 'Too many open event streams'}), 503
+
+    def stream():
+        cursor = since
+        deadline = time.time() + EVENT_STREAM_SECONDS
+        yield f'retry: 3000\nid: {cursor}\n\n'
+        while time.time() < deadline:
+            events, closed = change_feed.wait(cursor, EVENT_HEARTBEAT)
+            if not events:
+                yield ': keep-alive\n\n'
+            for seq, event_type, data in events:
+                cursor = seq
+                yield _format_event(seq, event_type, data)
+            if closed:
+                break
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the stream, including on client disconnect
+    response.call_on_close(change_feed.close_stream)
+    return response
+
+
+# ---------------- Warm start ----------------
+# The snapshots and lookup maps are saved to a local SQLite file, so after a
+# restart the first page is served from the last known state while the
+# stores reconcile with DefectDojo in the background.
+WARM_START_CONFIG = project_config.get('warm_start', {}) or {}
+WARM_START_PATH = WARM_START_CONFIG.get('path', 'snapshot_cache.db') if WARM_START_CONFIG.get('enabled', True) else None
+WARM_START_SAVE_INTERVAL = WARM_START_CONFIG.get('save_interval', 300)
+WARM_START_MAPS = ('users', 'products', 'environments')
+
+# Bump when the stored layout changes; files in an older format are ignored
+WARM_START_FORMAT = 1
+
+
+class WarmStartCache:
+    """
+    One row per saved collection: the gzipped JSON payload plus the format
+    version, the DefectDojo URL it came from and a sha256 of the payload.
+    Rows that do not match are ignored and the collection is cold-loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.last_save = None
+        self._saved = {}  # name -> version (stores) or loaded_at (maps) last written
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('CREATE TABLE IF NOT EXISTS snapshots (name TEXT PRIMARY KEY, format INTEGER, '
+                     'source TEXT, saved_at REAL, watermark TEXT, checksum TEXT, payload BLOB)')
+        return conn
+
+    def load(self, name):
+        """Return (value, watermark, saved_at) saved for `name`, or None."""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute('SELECT format, source, saved_at, watermark, checksum, payload '
+                                   'FROM snapshots WHERE name = ?', (name,)).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+            fmt, source, saved_at, watermark, checksum, payload = row
+            if fmt != WARM_START_FORMAT or source != API_BASE_URL:
+                return None
+            if hashlib.sha256(payload).hexdigest() != checksum:
+                print(f"Ignoring saved {name} snapshot: checksum mismatch")
+                return None
+            return json.loads(gzip.decompress(payload)), watermark, saved_at
+        except Exception as e:
+            print(f"Error reading saved {name} snapshot: {e}")
+            return None
+
+    def save(self, entries):
+        """Write entries of name -> (value, watermark, saved_at, marker) in one transaction."""
+        rows = []
+        for name, (value, watermark, saved_at, _) in entries.items():
+            payload = gzip.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 1)
+            checksum = hashlib.sha256(payload).hexdigest()
+            rows.append((name, WARM_START_FORMAT, API_BASE_URL, saved_at, watermark, checksum, payload))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        finally:
+            conn.close()
+        for name, entry in entries.items():
+            self._saved[name] = entry[3]
+        self.last_save = time.time()
+
+    def save_changed(self, force=False):
+        """Save whatever changed since the last save, at most once per save interval."""
+        if not self.path:
+            return
+        with self._lock:
+            if not force and self.last_save and time.time() - self.last_save < WARM_START_SAVE_INTERVAL:
+                return
+            entries = {}
+            for store in (engagement_store, test_store):
+                if not store.loaded:
+                    continue
+                version, rows, watermark, last_sync = store.persisted()
+                if self._saved.get(store.name) != version:
+                    entries[store.name] = ([dict(row) for row in rows], watermark, last_sync, version)
+            for name in WARM_START_MAPS:
+                entry = ref_cache.export(name)
+                if entry and self._saved.get(name) != entry[1]:
+                    # JSON object keys are strings, so ids are stored as pairs
+                    entries[name] = (list(entry[0].items()), None, entry[1], entry[1])
+            if entries:
+                self.save(entries)
+
+    def status(self):
+        return {'path': self.path, 'last_save': self.last_save}
+
+
+warm_start = WarmStartCache(WARM_START_PATH)
+
+
+def _warm_start_map(name):
+    if name not in WARM_START_MAPS:
+        return None
+    saved = warm_start.load(name)
+    if saved is None:
+        return None
+    pairs, _, saved_at = saved
+    return {key: value for key, value in pairs}, saved_at
+
+
+def save_warm_start():
+    try:
+        warm_start.save_changed(force=True)
+    except Exception as e:
+        print(f"Error saving warm-start snapshot: {e}")
+
+
+ref_cache.warm_loader = _warm_start_map
+sync_engine.after_sync.append(warm_start.save_changed)
+
+
+@app.route('/api/sync-status')
+def get_sync_status():
+    return jsonify({
+        'success': True,
+        'engagements': engagement_store.status(),
+        'tests': test_store.status(),
+        'warm_start': warm_start.status()
+    })
+
+# ---------------- Serving ----------------
+# "production" serves through waitress (or gunicorn on Linux) with a pool of
+# worker threads; "development" keeps Flask's debug server with the reloader.
+SERVER_CONFIG = project_config.get('server', {}) or {}
+SERVER_MODE = SERVER_CONFIG.get('mode', 'production')
+SERVER_BACKEND = SERVER_CONFIG.get('backend', 'auto')
+SERVER_HOST = SERVER_CONFIG.get('host', '127.0.0.1')
+SERVER_PORT = SERVER_CONFIG.get('port', 5000)
+SERVER_THREADS = SERVER_CONFIG.get('threads', 8)
+SERVER_WORKERS = SERVER_CONFIG.get('workers', 1)
+SHUTDOWN_GRACE = SERVER_CONFIG.get('shutdown_grace', 10)
+
+# Recorded before gunicorn forks, so workers can signal the master
+SERVER_PID = os.getpid()
+
+# Callables run once before the process exits (stop threads, flush state)
+shutdown_hooks = [sync_engine.stop, change_feed.close, save_warm_start]
+
+_active_requests = 0
+_active_lock = threading.Lock()
+_shutting_down = threading.Event()
+_server_backend = None
+
+try:
+    import waitress
+except Exception:
+    waitress = None
+
+try:
+    import gunicorn.app.base as gunicorn_base
+except Exception:
+    gunicorn_base = None
+
+
+@app.before_request
+def _track_request_start():
+    global _active_requests
+    with _active_lock:
+        _active_requests += 1
+
+
+@app.teardown_request
+def _track_request_end(exc=None):
+    global _active_requests
+    with _active_lock:
+        _active_requests -= 1
+
+
+@app.route('/healthz')
+def healthz():
+    return jsonify({
+        'status': 'stopping' if _shutting_down.is_set() else 'ok',
+        'server': _server_backend or 'flask',
+        'pid': os.getpid(),
+        'active_requests': _active_requests
+    }), 503 if _shutting_down.is_set() else 200
+
+
+def _launcher_only():
+    """
+    Error response unless the request comes from a local client posting JSON.
+    Loopback alone is not enough: any page open in the user's browser can
+    POST a form or text/plain body to 127.0.0.1. A JSON content type needs a
+    CORS preflight, which this server never grants to other origins.
+    """
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    if not request.is_json:
+        return jsonify({'success': False, 'error': 'Expected application/json'}), 415
+    return None
+
+
+@app.route('/shutdown', methods=['POST'])
+def shutdown():
+    # Only the local launcher may stop the server
+    denied = _launcher_only()
+    if denied:
+        return denied
+    if not _shutting_down.is_set():
+        _shutting_down.set()
+        threading.Thread(target=_graceful_exit, name='shutdown', daemon=True).start()
+    return jsonify({'success': True, 'message': 'Shutting down'})
+
+
+def _run_shutdown_hooks():
+    for hook in shutdown_hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"Shutdown hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+
+def _graceful_exit():
+    # Let in-flight requests (including the /shutdown reply) finish first
+    deadline = time.time() + SHUTDOWN_GRACE
+    time.sleep(0.2)
+    while _active_requests > 0 and time.time() < deadline:
+        time.sleep(0.1)
+    _run_shutdown_hooks()
+    if _server_backend == 'gunicorn' and os.getpid() != SERVER_PID:
+        # The gunicorn master stops the remaining workers gracefully
+        os.kill(SERVER_PID, signal.SIGTERM)
+        return
+    os._exit(0)
+
+
+def _on_stop_signal(signum, frame):
+    _shutting_down.set()
+    _run_shutdown_hooks()
+    os._exit(0)
+
+
+def choose_backend():
+    if SERVER_MODE != 'production':
+        return 'development'
+    if SERVER_BACKEND in ('waitress', 'gunicorn', 'flask'):
+        return SERVER_BACKEND
+    if waitress:
+        return 'waitress'
+    if gunicorn_base and sys.platform != 'win32':
+        return 'gunicorn'
+    return 'flask'
+
+
+def _run_gunicorn():
+    class GunicornServer(gunicorn_base.BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{SERVER_HOST}:{SERVER_PORT}')
+            self.cfg.set('workers', SERVER_WORKERS)
+            self.cfg.set('threads', SERVER_THREADS)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('graceful_timeout', SHUTDOWN_GRACE)
+            self.cfg.set('worker_exit', lambda arbiter, worker: _run_shutdown_hooks())
+
+        def load(self):
+            return app
+
+    GunicornServer().run()
+
+
+def run_server():
+    global _server_backend
+    _server_backend = choose_backend()
+    if _server_backend != 'gunicorn':
+        signal.signal(signal.SIGTERM, _on_stop_signal)
+
+    if _server_backend == 'waitress':
+        waitress.serve(app, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS)
+    elif _server_backend == 'gunicorn':
+        _run_gunicorn()
+    elif _server_backend == 'flask':
+        app.run(host=SERVER_HOST, port=SERVER_PORT, threaded=True, debug=False, use_reloader=False)
+    else:
+        app.run(debug=True, host=SERVER_HOST, port=SERVER_PORT)
+
 
 if __name__ == '__main__':
     print("=" * 60)
     print("Starting DefectDojo Engagement Manager v1.0.11")
     print("=" * 60)
     print(f"API Base URL: {API_BASE_URL}")
-    print(f"Server: http://127.0.0.1:5000")
+    print(f"Server: http://{SERVER_HOST}:{SERVER_PORT}")
+    print(f"Mode: {SERVER_MODE} ({choose_backend()}, {SERVER_THREADS} threads)")
     print("=" * 60)
     print("Press CTRL+C to stop")
     print("=" * 60)
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    run_server()
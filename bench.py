@@ -0,0 +1,383 @@
+"""
+Benchmark for the dashboard API against a local mock DefectDojo.
+
+Starts a stand-in for /api/v2/{engagements,tests,users,products,
+development_environments}/ with a synthetic dataset and injected latency,
+points app.py at it and drives every read endpoint through the Flask test
+client. Reports p50/p95/p99 latency, throughput and the upstream calls each
+scenario caused.
+
+    python bench.py --engagements 10000 --latency 50
+    python bench.py --engagements 100000 --bypass-cache --save bench.json
+    python bench.py --compare bench.json      # exit 1 if a p95 regressed
+
+Run from the project folder (app.py reads project.json from the working
+directory). The warm-start file is not read or written.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+STATUSES = ['Not Started', 'In Progress', 'On Hold', 'Completed', 'Cancelled']
+MENTOR_STATUSES = [None, 'Mentor OK', 'Mentor Pending', 'Mentor Review']
+LEAD_STATUSES = [None, 'Lead OK', 'Lead Review']
+JIRA_STATUSES = ['', 'Open', 'In Dev', 'Ready for testing', 'Done', 'Not Done']
+JIRA_TYPES = ['', 'Security', 'Functional', 'Bug']
+ANALYSIS_STATUSES = ['Pending', 'On Hold', 'Approved', 'Rejected', '']
+TAGS = [['mcr_jira'], ['mcr_jira', 'regression'], ['MCR_JIRA_imported'], [], ['other']]
+
+
+# ---------------- Synthetic dataset ----------------
+def _day(rnd, year=2025):
+    return f'{year}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}'
+
+
+def make_dataset(engagements, tests_per_engagement=5, users=50, products=20, environments=6, seed=1):
+    rnd = random.Random(seed)
+    data = {
+        'users': [{'id': i, 'username': f'user{i}', 'first_name': f'First{i}', 'last_name': f'Last{i}'}
+                  for i in range(1, users + 1)],
+        'products': [{'id': i, 'name': f'Product {i}'} for i in range(1, products + 1)],
+        'development_environments': [{'id': i, 'name': f'Build type {i}'} for i in range(1, environments + 1)],
+        'engagements': [],
+        'tests': []
+    }
+    for i in range(1, engagements + 1):
+        data['engagements'].append({
+            'id': i,
+            'name': f'Task {i} {rnd.choice(["release", "hotfix", "review", "audit"])}',
+            'created': f'{_day(rnd)}T{rnd.randint(0, 23):02d}:00:00.000000Z',
+            'updated': f'{_day(rnd)}T{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00.000000Z',
+            'status': rnd.choice(STATUSES),
+            'lead': rnd.choice([None] + list(range(1, users + 1))),
+            'product': rnd.randint(1, products),
+            'target_start': rnd.choice([None, _day(rnd)]),
+            'target_end': rnd.choice([None, _day(rnd)]),
+            'build_id': rnd.choice(MENTOR_STATUSES),
+            'commit_hash': rnd.choice(LEAD_STATUSES),
+            'version': rnd.choice([None, '1.0', '2.0']),
+            'description': 'Synthetic engagement',
+            'tags': [],
+            'engagement_type': 'Interactive',
+            'active': True
+        })
+    test_id = 0
+    for eng in data['engagements']:
+        for _ in range(rnd.randint(0, tests_per_engagement * 2)):
+            test_id += 1
+            data['tests'].append({
+                'id': test_id,
+                'title': f'JIRA-{test_id} {rnd.choice(["login", "crash", "timeout", "xss", "leak"])}',
+                'created': f'{_day(rnd)}T08:00:00.000000Z',
+                'updated': f'{_day(rnd)}T{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00.000000Z',
+                'tags': rnd.choice(TAGS),
+                'build_id': rnd.choice(ANALYSIS_STATUSES),
+                'branch_tag': rnd.choice(JIRA_STATUSES),
+                'commit_hash': rnd.choice(JIRA_TYPES),
+                'lead': rnd.choice([None] + list(range(1, users + 1))),
+                'environment': rnd.randint(1, environments),
+                'engagement': eng['id'],
+                'target_start': eng['target_start'] or '2025-01-01',
+                'target_end': eng['target_end'] or '2025-12-31',
+                'test_type': 1,
+                'test_type_name': 'Manual Code Review',
+                'description': 'Synthetic test',
+                'percent_complete': None,
+                'notes': []
+            })
+    return data
+
+
+# ---------------- Mock DefectDojo ----------------
+class MockDojo:
+    """Paginated, filterable stand-in for the DefectDojo v2 list endpoints."""
+
+    def __init__(self, data, latency=0.0, port=0):
+        self.data = data
+        self.latency = latency
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def call_counts(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def _count(self, key):
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def _filter(self, rows, params):
+        for key, value in params.items():
+            if key == 'tag':
+                rows = [r for r in rows if any(value.lower() in str(t).lower() for t in r.get('tags') or [])]
+            elif key == 'tags':
+                wanted = set(value.split(','))
+                rows = [r for r in rows if wanted.intersection(r.get('tags') or [])]
+            elif key.endswith('__in'):
+                field, values = key[:-4], set(value.split(','))
+                rows = [r for r in rows if str(r.get(field)) in values]
+            elif key.endswith(('__gte', '__lte', '__gt', '__lt')):
+                field, op = key.rsplit('__', 1)
+                check = {'gte': lambda v: v >= value, 'lte': lambda v: v <= value,
+                         'gt': lambda v: v > value, 'lt': lambda v: v < value}[op]
+                rows = [r for r in rows if r.get(field) and check(str(r.get(field)))]
+            else:
+                rows = [r for r in rows if str(r.get(key) if r.get(key) is not None else '') == value]
+        return rows
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _collection(self):
+                parsed = urlparse(self.path)
+                parts = [p for p in parsed.path.split('/') if p]
+                name = parts[2] if len(parts) > 2 else ''
+                return parsed, parts, name
+
+            def do_GET(self):
+                parsed, parts, name = self._collection()
+                mock._count(f'GET {name}')
+                if mock.latency:
+                    time.sleep(mock.latency)
+                rows = mock.data.get(name)
+                if rows is None:
+                    return self._send(404, {'detail': 'Not found.'})
+                if len(parts) > 3:
+                    match = [r for r in rows if str(r['id']) == parts[3]]
+                    return self._send(200, match[0]) if match else self._send(404, {'detail': 'Not found.'})
+
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                limit = min(int(query.pop('limit', 25)), 1000)
+                offset = int(query.pop('offset', 0))
+                ordering = query.pop('o', None)
+                rows = mock._filter(rows, query)
+                if ordering:
+                    field = ordering.lstrip('-')
+                    rows = sorted(rows, key=lambda r: (str(r.get(field) or ''), r['id']),
+                                  reverse=ordering.startswith('-'))
+                next_url = None
+                if offset + limit < len(rows):
+                    args = dict(query, limit=limit, offset=offset + limit)
+                    if ordering:
+                        args['o'] = ordering
+                    next_url = f'{mock.url}{parsed.path}?{urlencode(args)}'
+                self._send(200, {'count': len(rows), 'next': next_url, 'previous': None,
+                                 'results': rows[offset:offset + limit]})
+
+            def do_PUT(self):
+                parsed, parts, name = self._collection()
+                mock._count(f'PUT {name}')
+                if mock.latency:
+                    time.sleep(mock.latency)
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                for row in mock.data.get(name, []):
+                    if len(parts) > 3 and str(row['id']) == parts[3]:
+                        row.update(body)
+                        row['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S.000000Z', time.gmtime())
+                        return self._send(200, row)
+                self._send(404, {'detail': 'Not found.'})
+
+        return Handler
+
+
+# ---------------- Scenarios ----------------
+def scenarios(data, rnd):
+    engagement_ids = [e['id'] for e in data['engagements']]
+    lead = data['users'][0]['id']
+    return [
+        ('engagements page', 'GET', '/api/engagements?page=1&limit=50', None),
+        ('engagements deep page', 'GET', '/api/engagements?page=20&limit=50', None),
+        ('engagements text filter', 'GET', '/api/engagements?task_name=release&limit=50', None),
+        ('engagements status+lead', 'GET', f'/api/engagements?status=In%20Progress&assigned_to={lead}&limit=50', None),
+        ('engagements date ranges', 'GET', '/api/engagements?created_from=2025-02-01&created_to=2025-09-30'
+                                          '&appsec_eta_from=2025-03-01&rm_eta_to=2025-11-30&limit=50', None),
+        ('engagements sorted', 'GET', '/api/engagements?sort=aging&order=desc&limit=50', None),
+        ('tests page', 'GET', '/api/tests?page=1&limit=50', None),
+        ('tests filters', 'GET', '/api/tests?jira_type=Security&analysis_status=Pending&title=login&limit=50', None),
+        ('filter options', 'GET', '/api/filter-options', None),
+        ('test filter options', 'GET', '/api/test-filter-options', None),
+        ('summary engagements', 'GET', '/api/summary/engagements', None),
+        ('summary jiras', 'GET', '/api/summary/jiras', None),
+        ('jira counts (50)', 'POST', '/api/jira-counts',
+         {'engagement_ids': rnd.sample(engagement_ids, min(50, len(engagement_ids)))}),
+    ]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_scenario(app_module, client_factory, mock, scenario, requests_count, concurrency, bypass_cache):
+    name, method, path, body = scenario
+    route = urlparse(path).path
+    before = mock.call_counts()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        client = client_factory()
+        if bypass_cache:
+            app_module.response_cache.invalidate(route)
+        started = time.perf_counter()
+        response = client.get(path) if method == 'GET' else client.post(path, json=body)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_count)))
+    wall = time.perf_counter() - started
+
+    after = mock.call_counts()
+    upstream = {k: after[k] - before.get(k, 0) for k in after if after[k] != before.get(k, 0)}
+    return {
+        'name': name,
+        'requests': requests_count,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'throughput_rps': round(requests_count / wall, 1) if wall else 0.0,
+        'upstream_calls': upstream
+    }
+
+
+def print_report(meta, results):
+    print(f"\nDataset: {meta['engagements']} engagements, {meta['tests']} tests, "
+          f"upstream latency {meta['latency_ms']} ms, concurrency {meta['concurrency']}, "
+          f"response cache {'bypassed' if meta['bypass_cache'] else 'on'}")
+    print(f"Cold start (first engagements + tests load): {meta['cold_start_ms']:.0f} ms, "
+          f"upstream calls {sum(meta['cold_start_calls'].values())}")
+    print(f"\n{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'errors':>8}  upstream")
+    for r in results:
+        upstream = ', '.join(f'{k}={v}' for k, v in sorted(r['upstream_calls'].items())) or '-'
+        print(f"{r['name']:<28}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['throughput_rps']:>9.1f}{r['errors']:>8}  {upstream}")
+
+
+def compare(results, baseline_path, threshold):
+    """Return the scenarios whose p95 got worse than the baseline by more than `threshold`."""
+    with open(baseline_path, 'r') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        old = baseline.get(r['name'])
+        # Ignore sub-millisecond noise
+        if old and r['p95_ms'] > old['p95_ms'] * (1 + threshold) and r['p95_ms'] - old['p95_ms'] > 1:
+            regressions.append((r['name'], old['p95_ms'], r['p95_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark app.py against a mock DefectDojo')
+    parser.add_argument('--engagements', type=int, default=10000, help='synthetic engagements (1k-100k)')
+    parser.add_argument('--tests-per-engagement', type=int, default=5, help='average tests per engagement')
+    parser.add_argument('--latency', type=float, default=20, help='injected upstream latency per call, ms')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--bypass-cache', action='store_true', help='invalidate the response cache before each request')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='write results as JSON')
+    parser.add_argument('--compare', help='baseline JSON from --save; exit 1 on p95 regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p95 slowdown for --compare')
+    args = parser.parse_args()
+
+    print(f'Generating {args.engagements} engagements...')
+    data = make_dataset(args.engagements, args.tests_per_engagement, seed=args.seed)
+    mock = MockDojo(data, latency=args.latency / 1000.0).start()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    app_module.API_BASE_URL = mock.url
+    app_module.warm_start.path = None
+    app_module.sync_engine.interval = 0  # keep background syncs out of the numbers
+    client = app_module.app.test_client()
+
+    # Cold start: both snapshots and the lookup maps are loaded here
+    started = time.perf_counter()
+    for path in ('/api/engagements?limit=50', '/api/tests?limit=50'):
+        response = client.get(path)
+        if response.status_code != 200:
+            print(f'Cold start failed: {path} {response.status_code} {response.get_data(as_text=True)[:200]}')
+            return 1
+    cold_start_ms = (time.perf_counter() - started) * 1000
+    cold_start_calls = mock.call_counts()
+
+    rnd = random.Random(args.seed)
+    results = []
+    for scenario in scenarios(data, rnd):
+        results.append(run_scenario(app_module, app_module.app.test_client, mock, scenario,
+                                    args.requests, args.concurrency, args.bypass_cache))
+
+    meta = {
+        'engagements': len(data['engagements']),
+        'tests': len(data['tests']),
+        'latency_ms': args.latency,
+        'concurrency': args.concurrency,
+        'bypass_cache': args.bypass_cache,
+        'cold_start_ms': round(cold_start_ms, 1),
+        'cold_start_calls': cold_start_calls
+    }
+    print_report(meta, results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f'\nSaved {args.save}')
+
+    mock.stop()
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for name, old, new in regressions:
+            print(f'REGRESSION {name}: p95 {old:.2f} ms -> {new:.2f} ms')
+        if regressions:
+            return 1
+        print(f'\nNo p95 regressions over {args.threshold:.0%} against {args.compare}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
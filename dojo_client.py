@@ -0,0 +1,141 @@
+"""
+Pooled HTTP client for all DefectDojo traffic.
+- one requests.Session with a keep-alive connection pool (no handshake per call)
+- retries with jittered exponential backoff on 429/5xx and connection errors
+- gzip negotiation
+- a per-host semaphore that caps concurrent upstream calls
+- RateLimiter, a token bucket for spreading batches of calls over time
+- an optional observer called with the timing of every attempt (for metrics)
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DojoClient:
+    def __init__(self, headers=None, pool_size=16, max_concurrency=8, retries=3,
+                 backoff=0.5, backoff_max=8.0, timeout=30):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        # fn(method, url, status, seconds) after every attempt; status is None on connection errors
+        self.observer = None
+        self.in_flight = 0
+
+        self.session = requests.Session()
+        # Retries are handled in request() so they can be jittered and logged
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        if headers:
+            self.session.headers.update(headers)
+
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slots(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._host_slots[host]
+
+    def _sleep(self, attempt, retry_after=None):
+        delay = None
+        if retry_after:
+            try:
+                delay = min(float(retry_after), self.backoff_max)
+            except ValueError:
+                delay = None
+        if delay is None:
+            # Full jitter: spread retries from many threads over the whole window
+            delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+        time.sleep(delay)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        slots = self._slots(url)
+        attempt = 0
+        while True:
+            try:
+                with slots:
+                    response = self._timed_request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                print(f"{method} {url} failed ({e}), retrying")
+                self._sleep(attempt)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                print(f"{method} {url} returned {response.status_code}, retrying")
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+                self._sleep(attempt, retry_after)
+                attempt += 1
+                continue
+
+            return response
+
+    def _timed_request(self, method, url, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+        started = time.perf_counter()
+        status = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            if self.observer is not None:
+                try:
+                    self.observer(method, url, status, time.perf_counter() - started)
+                except Exception:
+                    pass
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,67 @@
+"""
+CSV/XLSX exports: cells a spreadsheet would run as formulas are written as
+text, everything else is written unchanged.
+"""
+
+import csv
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+# Nothing here may talk to DefectDojo
+app.sync_engine.interval = 0
+
+COLUMNS = [('id', 'ID'), ('name', 'Name'), ('lead', 'Lead')]
+ROWS = [
+    [1, '=HYPERLINK("http://evil","x")', 'ok'],
+    [2, '+1+2', '-3'],
+    [3, '@SUM(A1)', '\tcmd'],
+    [4, '\rline', 'a=b'],
+    [-5, '', None],
+]
+EXPECTED = [
+    [1, '\'=HYPERLINK("http://evil","x")', 'ok'],
+    [2, "'+1+2", "'-3"],
+    [3, "'@SUM(A1)", "'\tcmd"],
+    [4, "'\rline", 'a=b'],
+    [-5, '', None],
+]
+
+
+def body(response):
+    return b''.join(response.response)
+
+
+class ExportEscapingTest(unittest.TestCase):
+
+    def test_csv_quotes_formulas(self):
+        text = body(app.export_response('engagements', COLUMNS, iter(ROWS), 'csv')).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(text, newline='')))
+        self.assertEqual(rows[0], ['ID', 'Name', 'Lead'])
+        expected = [[str(value) if value is not None else '' for value in row] for row in EXPECTED]
+        self.assertEqual(rows[1:], expected)
+
+    @unittest.skipIf(app.Workbook is None, 'openpyxl not installed')
+    def test_xlsx_quotes_formulas(self):
+        from openpyxl import load_workbook
+
+        data = body(app.export_response('engagements', COLUMNS, iter(ROWS), 'xlsx'))
+        sheet = load_workbook(io.BytesIO(data)).active
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], ['ID', 'Name', 'Lead'])
+        # Empty strings come back as empty cells and XML turns CR into LF
+        expected = [[None if value == '' else value.replace('\r', '\n') if isinstance(value, str) else value
+                     for value in row] for row in EXPECTED]
+        self.assertEqual(rows[1:], expected)
+        for row in sheet.iter_rows(min_row=2):
+            for cell in row:
+                self.assertNotEqual(cell.data_type, 'f', cell.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
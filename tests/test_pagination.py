@@ -0,0 +1,69 @@
+"""
+Upstream pagination: iter_collection must return every row even when
+DefectDojo caps `limit` below the page size we ask for.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+# Nothing here may talk to DefectDojo
+app.sync_engine.interval = 0
+
+
+class CappedDojo:
+    """Answers _get_page like DefectDojo's limit/offset pagination, with a server-side cap."""
+
+    def __init__(self, rows, cap):
+        self.rows = rows
+        self.cap = cap
+        self.calls = 0
+
+    def get_page(self, url, params=None):
+        self.calls += 1
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        query.update({k: str(v) for k, v in (params or {}).items()})
+        limit = min(int(query.get('limit', 25)), self.cap)
+        offset = int(query.get('offset', 0))
+        page = self.rows[offset:offset + limit]
+        next_url = None
+        if offset + limit < len(self.rows):
+            next_query = dict(query, offset=offset + limit, limit=limit)
+            next_url = f'{parsed.scheme}://{parsed.netloc}{parsed.path}?{urlencode(next_query)}'
+        return {'count': len(self.rows), 'next': next_url, 'previous': None, 'results': page}
+
+
+class IterCollectionTest(unittest.TestCase):
+
+    def collect(self, total, cap, page_size, concurrency=4):
+        dojo = CappedDojo([{'id': i} for i in range(1, total + 1)], cap)
+        with mock.patch.object(app, '_get_page', dojo.get_page):
+            rows = list(app.iter_collection('/api/v2/engagements/', page_size=page_size,
+                                            concurrency=concurrency))
+        return [row['id'] for row in rows], dojo
+
+    def test_every_row_when_server_caps_limit(self):
+        for page_size in (250, 1000, 1500, 2000, 5000):
+            for concurrency in (1, 4):
+                ids, _ = self.collect(3500, 1000, page_size, concurrency)
+                self.assertEqual(ids, list(range(1, 3501)), (page_size, concurrency))
+
+    def test_uncapped_pages_fetched_once(self):
+        ids, dojo = self.collect(1000, 10000, 250)
+        self.assertEqual(ids, list(range(1, 1001)))
+        self.assertEqual(dojo.calls, 4)
+
+    def test_single_and_empty_pages(self):
+        self.assertEqual(self.collect(0, 1000, 250)[0], [])
+        self.assertEqual(self.collect(7, 1000, 250)[0], list(range(1, 8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,294 @@
+"""
+Correctness checks for the copy-on-write index patching and keyset paging.
+
+RowIndex.patched() and SnapshotStore._apply() must leave the indexes exactly
+as a rebuild from the same rows would, and walking next cursors must return
+the same rows, in the same order, as one fully sorted list.
+"""
+
+import base64
+import json
+import os
+import random
+import sys
+import time
+import unittest
+
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+# Nothing here may talk to DefectDojo
+app.sync_engine.interval = 0
+
+STATUSES = ['Not Started', 'In Progress', 'On Hold', 'Completed', 'Cancelled']
+BUILDS = ['Pending', 'On Hold', 'Approved', ' Pending ', None]
+WORDS = ['alpha', 'beta', 'crash', 'login', 'Build', 'task', 'zeta']
+
+
+def _date(rnd, blank=0.2):
+    if rnd.random() < blank:
+        return rnd.choice([None, ''])
+    return f'2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}'
+
+
+def _timestamp(rnd):
+    return f'{_date(rnd, blank=0)}T{rnd.randint(0, 23):02d}:00:00Z'
+
+
+def _title(rnd):
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3)))
+
+
+ENGAGEMENT_FIELDS = {
+    'name': _title,
+    'status': lambda rnd: rnd.choice(STATUSES),
+    'lead': lambda rnd: rnd.choice([1, 2, 3, None]),
+    'product': lambda rnd: rnd.randint(1, 4),
+    'build_id': lambda rnd: rnd.choice([None, 'Mentor OK', 'Lead Review']),
+    'commit_hash': lambda rnd: rnd.choice([None, 'abc', 'def']),
+    'created': _timestamp,
+    'updated': _timestamp,
+    'target_start': _date,
+    'target_end': _date,
+}
+
+TEST_FIELDS = {
+    'title': _title,
+    'tags': lambda rnd: rnd.choice([['mcr_jira'], ['MCR_JIRA_x'], ['other'], []]),
+    'build_id': lambda rnd: rnd.choice(BUILDS),
+    'branch_tag': lambda rnd: rnd.choice(['Done', 'Open', '']),
+    'commit_hash': lambda rnd: rnd.choice(['Bug', 'Security', '']),
+    'lead': lambda rnd: rnd.choice([1, 2, None]),
+    'environment': lambda rnd: rnd.randint(1, 3),
+    'engagement': lambda rnd: rnd.randint(1, 20),
+    'created': _timestamp,
+    'updated': _timestamp,
+    'target_start': _date,
+    'target_end': _date,
+}
+
+KINDS = {
+    'engagements': (app.EngagementRecord.from_row, app._build_engagement_index, ENGAGEMENT_FIELDS),
+    'tests': (app.TestRecord.from_row, app._build_test_index, TEST_FIELDS),
+}
+
+
+def make_rows(kind, count, rnd):
+    record, _, fields = KINDS[kind]
+    return [record(dict({name: make(rnd) for name, make in fields.items()}, id=row_id))
+            for row_id in range(1, count + 1)]
+
+
+def edit(kind, row, rnd):
+    record, _, fields = KINDS[kind]
+    changed = dict(row)
+    for name in rnd.sample(sorted(fields), rnd.randint(1, 3)):
+        changed[name] = fields[name](rnd)
+    return record(changed)
+
+
+def queries(index):
+    """A spread of filters over every index the table endpoints use."""
+    found = [{}]
+    for field, values in index.equal.items():
+        for value in list(values)[:3]:
+            found.append({'equal': {field: value}})
+    for field in index.dates:
+        found.append({'ranges': {field: ('2025-03-01', '2025-09-30')}})
+        found.append({'ranges': {field: ('', '2025-05-15')}})
+    for text in ('alpha', 'cra', 'ta b', 'zz'):
+        found.append({'text': text})
+    return found
+
+
+class IndexAssertions(unittest.TestCase):
+
+    def assertSameIndex(self, patched, fresh):
+        self.assertEqual([row.get('id') for row in patched.rows], [row.get('id') for row in fresh.rows])
+        self.assertEqual(patched.rows, fresh.rows)
+        self.assertEqual(patched.positions, fresh.positions)
+        self.assertEqual(patched.equal, fresh.equal)
+        self.assertEqual(patched.text, fresh.text)
+        self.assertEqual(patched.grams, fresh.grams)
+        for field, (values, positions, undated) in fresh.dates.items():
+            got_values, got_positions, got_undated = patched.dates[field]
+            self.assertEqual(got_values, values)
+            # Equal dates may sit in any order; the (value, position) pairs must match
+            self.assertEqual(sorted(zip(got_values, got_positions)), sorted(zip(values, positions)))
+            self.assertEqual(got_undated, undated)
+        self.assertEqual(set(patched.date_columns), set(fresh.date_columns))
+        for field, column in fresh.date_columns.items():
+            got = patched.date_columns[field]
+            if column is None or got is None:
+                self.assertIs(got, column)
+            else:
+                self.assertEqual(got.tolist(), column.tolist())
+
+        for query in queries(fresh):
+            expected = fresh.select(**query)
+            result = patched.select(**query)
+            self.assertEqual(sorted(result), sorted(expected), query)
+            for sort in fresh.sort_fields:
+                for descending in (False, True):
+                    got = patched.page(result, sort, descending, 0, len(fresh.rows) + 1)[0]
+                    want = fresh.page(expected, sort, descending, 0, len(fresh.rows) + 1)[0]
+                    self.assertEqual(got, want, (query, sort, descending))
+
+
+class PatchedIndexTest(IndexAssertions):
+
+    def check_kind(self, kind, seed):
+        rnd = random.Random(seed)
+        _, build, _ = KINDS[kind]
+        rows = make_rows(kind, 150, rnd)
+        index = build(rows)
+        for sort in index.sort_fields:
+            index.order(sort)  # patched() has to carry or drop these
+
+        patched_count = 0
+        for _ in range(200):
+            pos = rnd.randrange(len(rows))
+            old = rows[pos]
+            new = edit(kind, old, rnd)
+            rows = rows[:pos] + [new] + rows[pos + 1:]
+            result = index.patched(old, new)
+            if result is None:
+                # Row entered or left the index: the store rebuilds
+                index = build(rows)
+            else:
+                index = result
+                patched_count += 1
+            self.assertSameIndex(index, build(rows))
+        self.assertGreater(patched_count, 20)
+
+    def test_engagement_index(self):
+        self.check_kind('engagements', 1)
+
+    def test_test_index(self):
+        self.check_kind('tests', 2)
+
+
+class StoreApplyTest(IndexAssertions):
+
+    def make_store(self, kind, rows):
+        record, build, _ = KINDS[kind]
+        store = app.SnapshotStore(kind, f'/api/v2/{kind}/', record)
+        store.patchers['index'] = app.RowIndex.patched
+        with store._lock:
+            store._publish({row.get('id'): row for row in rows})
+            store.last_sync = store.last_full_sync = time.time()
+        return store
+
+    def check_kind(self, kind, seed):
+        rnd = random.Random(seed)
+        _, build, _ = KINDS[kind]
+        store = self.make_store(kind, make_rows(kind, 120, rnd))
+        next_id = 1000
+        for step in range(120):
+            store.derived('index', build)
+            current = store.rows()
+            changed = [edit(kind, rnd.choice(current), rnd) for _ in range(rnd.randint(1, 4))]
+            removed = []
+            if step % 10 == 3:
+                removed = [rnd.choice(current).get('id')]
+            if step % 10 == 7:
+                changed.append(make_rows(kind, 1, rnd)[0])
+                changed[-1] = KINDS[kind][0](dict(changed[-1], id=next_id))
+                next_id += 1
+            store._apply(changed, removed=removed)
+
+            rows = store.rows()
+            self.assertEqual(len({row.get('id') for row in rows}), len(rows))
+            for row_id in removed:
+                self.assertNotIn(row_id, {row.get('id') for row in rows})
+            self.assertSameIndex(store.derived('index', build), build(rows))
+
+    def test_engagement_store(self):
+        self.check_kind('engagements', 3)
+
+    def test_test_store(self):
+        self.check_kind('tests', 4)
+
+
+class CursorWalkTest(unittest.TestCase):
+
+    def walk(self, index, result, sort, descending, limit):
+        got, after = [], None
+        for _ in range(len(index.rows) + 2):
+            positions, last_key, has_more = index.page(result, sort, descending, 0, limit, after)
+            got.extend(positions)
+            if not has_more:
+                return got
+            self.assertIsNotNone(last_key)
+            # Round-trip through the cursor the endpoints hand out
+            order = 'desc' if descending else 'asc'
+            after = tuple(app.decode_cursor(app.encode_cursor(sort, order, last_key), sort, order,
+                                            index.key_type(sort)))
+        self.fail('cursor walk did not terminate')
+
+    def check_kind(self, kind, seed):
+        rnd = random.Random(seed)
+        _, build, _ = KINDS[kind]
+        index = build(make_rows(kind, 400, rnd))
+        results = {
+            'all': index.all,
+            'most': set(pos for pos in index.all if pos % 7),   # walks the sort order
+            'few': set(rnd.sample(sorted(index.all), 9)),       # sorts the matches by rank
+            'none': set(),
+        }
+        for name, result in results.items():
+            for sort in index.sort_fields:
+                key = index.sort_fields[sort]
+                for descending in (False, True):
+                    expected = sorted(result, key=lambda pos: (key(index.rows[pos]), index.rows[pos].get('id') or 0),
+                                      reverse=descending)
+                    for limit in (1, 3, 10, 1000):
+                        got = self.walk(index, result, sort, descending, limit)
+                        self.assertEqual(got, expected, (name, sort, descending, limit))
+
+                        # Offset pages over the same sort agree with the cursor walk
+                        paged = []
+                        for offset in range(0, len(result) + limit, limit):
+                            paged.extend(index.page(result, sort, descending, offset, limit)[0])
+                        self.assertEqual(paged, expected, (name, sort, descending, limit))
+
+    def test_engagement_cursors(self):
+        self.check_kind('engagements', 5)
+
+    def test_test_cursors(self):
+        self.check_kind('tests', 6)
+
+    def test_tampered_cursors_are_rejected(self):
+        index = app._build_engagement_index(make_rows('engagements', 50, random.Random(7)))
+
+        def raw_cursor(decoded):
+            raw = json.dumps(decoded).encode('utf-8')
+            return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+        tampered = {
+            'aging': [['aging', 'asc', 'x', 'abc'], ['aging', 'asc', '3', 1], ['aging', 'asc', 3, '1'],
+                      ['aging', 'asc', True, 1], ['aging', 'asc', 3, None], ['aging', 'asc', 3]],
+            'created': [['created', 'asc', 5, 1], ['created', 'asc', None, 1], ['created', 'asc', ['x'], 1],
+                        ['created', 'asc', '2025-01-01', 1.5], ['created', 'asc', '2025-01-01', 1, 2]],
+            'id': [['id', 'asc', 'x', 'abc'], ['id', 'asc', 0, 'abc']],
+        }
+        for sort, cursors in tampered.items():
+            for decoded in cursors:
+                args = MultiDict({'sort': sort, 'order': 'asc', 'limit': '5', 'cursor': raw_cursor(decoded)})
+                with self.assertRaises(ValueError, msg=decoded):
+                    app.paginate(index, index.all, args)
+        for cursor in ('zzz', raw_cursor({'sort': 'id'}), raw_cursor('text')):
+            with self.assertRaises(ValueError):
+                app.paginate(index, index.all, MultiDict({'sort': 'id', 'limit': '5', 'cursor': cursor}))
+
+        # A genuine cursor still pages
+        positions, meta = app.paginate(index, index.all, MultiDict({'sort': 'created', 'limit': '5'}))
+        args = MultiDict({'sort': 'created', 'limit': '5', 'cursor': meta['next_cursor']})
+        self.assertEqual(len(app.paginate(index, index.all, args)[0]), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()